@@ -1,5 +1,6 @@
-import bisect
 import math
+import numpy as np
+from recording_data import LoadIntervals
 
 class KIMScore:
     def __init__(self, operator, task, postures, loads):
@@ -30,100 +31,133 @@ class KIMScore:
 
     def calculate_ABP(self, duration=None, index=None):
         time_rating = self.total_duration/3600
+        durations_A, durations_B, durations_C = self.accumulate_ABP_durations(index)
+        self.ABP_score = [time_rating, self.calculate_ABP_intensity(durations_A, durations_B, durations_C)]
 
+    def accumulate_ABP_durations(self, index=None):
+        #durations of the categories of postures A, B and C (and twisting/bending) before the index, without postures under loads greater than 3 kg
+        # Iterate over the posture episodes before the index (if provided), in which the closest load event does not change
+        episodes = self.get_posture_episodes()
         if index is not None:
-            postures = self.postures[:index]
-        else:
-            postures = self.postures
-
-        load_timestamps = [load["time"] for load in self.loads]
+            episodes = self.postures.cut_episodes(episodes, index)
+        heavy_loads = self.get_load_intervals().heavy_load_postures[episodes.start].tolist()     #ABP score is not considered for loads greater than 3 kg (use LHC instead)
+        codes, times = episodes.code.tolist(), episodes.time.tolist()
+        ABP_categories = self.postures.lookup("KIM ABP categories", self.find_ABP_posture_categories)
 
-        score_A = 0
-        load_index = 0
         durations = [0]*6   #last duration is for twisting/bending in unfavorable working conditions
-        for posture in postures:
-            load_index = bisect.bisect(load_timestamps,posture["timestamp"],load_index)     #find index of load event closest in time to current posture
-            if load_index >= len(self.loads):
-                load_index -= 1
-            if self.loads[load_index]["weight"] > 3:                                        #ABP score is not considered for loads greater than 3 kg (use LHC instead)
+        for code, time, heavy_load in zip(codes, times, heavy_loads):
+            if heavy_load:
                 continue
-            if "U" in posture["posture"]:               #upright back posture
-                durations[0] += posture["time"]
-            elif "BF" in posture["posture"]:            #moderately inclined forward
-                durations[1] += posture["time"]
-            elif "BS" in posture["posture"]:            #strongly inclined forward
-                durations[2] += posture["time"]
-            elif "Cr_BS" in posture["posture"]:         #"forced postures", not sure how to detect that
-                durations[3] += posture["time"]
-            if int(posture["posture"][-1]) >= 2 or int(posture["posture"][-5]) >= 2:    #check if severe lateral bending or trunk rotation is present
-                durations[-1] += posture["time"]
+            category, twisting = ABP_categories[code][0]
+            if category is not None:
+                durations[category] += time
+            if twisting:
+                durations[-1] += time
             #sitting in variable posture very difficult to detect
+        durations_A = durations
+
+        durations = [0]*5 + durations[-1:]   #last duration is for twisting/bending in unfavorable working conditions
+        for code, time, heavy_load in zip(codes, times, heavy_loads):
+            if heavy_load:
+                continue
+            category, twisting = ABP_categories[code][1]
+            if category is not None:
+                durations[category] += time
+            if twisting:
+                durations[-1] += time
+        durations_B = durations
+
+        durations = [0]*5 + durations[-1:]  #last duration is for twisting/bending in unfavorable working conditions
+        for code, time, heavy_load in zip(codes, times, heavy_loads):
+            if heavy_load:
+                continue
+            category, twisting = ABP_categories[code][2]
+            if category is not None:
+                durations[category] += time
+            if twisting:
+                durations[-1] += time
+        durations_C = durations
+
+        return durations_A, durations_B, durations_C
+
+    def get_load_intervals(self):
+        #closest load event of each posture, usually found once when the recording is loaded
+        if self.loads.intervals is None:
+            self.loads.intervals = LoadIntervals(self.loads, self.postures)
+        return self.loads.intervals
+
+    def get_posture_episodes(self):
+        #runs of the same posture and closest load event, usually found once when the recording is loaded
+        if self.postures.episodes is None:
+            return self.postures.find_episodes(self.loads.time)
+        return self.postures.episodes
+
+    def find_ABP_posture_categories(self, posture):
+        #category and twisting of the posture for posture groups A, B and C
+        return [self.find_ABP_posture_category(posture, posture_group) for posture_group in range(3)]
+
+    def find_ABP_posture_category(self, posture, posture_group):
+        #returns the duration index of the posture within posture group A, B or C (None if not in the group) and whether severe twisting/bending is present
+        category = None
+        if posture_group == 0:
+            if "U" in posture:               #upright back posture
+                category = 0
+            elif "BF" in posture:            #moderately inclined forward
+                category = 1
+            elif "BS" in posture:            #strongly inclined forward
+                category = 2
+            elif "Cr_BS" in posture:         #"forced postures", not sure how to detect that
+                category = 3
+        elif posture_group == 1:
+            if "OS" in posture or "OH" in posture:        #hands above shoulders or head
+                category = 0
+            elif int(posture[-9]) >= 1:   #arms below shoulders level but away from body, #very difficult to detect unsupported arms
+                category = 1
+            elif "Ly" in posture and ("OH" in posture or int(posture[-9]) >= 2):     #lying on back with hands over head or lying on stomach with hands below body (not sure how to detect last one)
+                category = 2
+        elif posture_group == 2:
+            if "St" in posture:        #constant standing
+                category = 0
+            #very difficult to detect unsupported arms
+            elif "Cr" in posture:     #kneeling, squatting or sitting cross-legged (not sure how to detect that last one)
+                category = 2
+        twisting = int(posture[-1]) >= 2 or int(posture[-5]) >= 2    #check if severe lateral bending or trunk rotation is present
+        return category, twisting
 
+    def calculate_ABP_intensity(self, durations_A, durations_B, durations_C):
         #score for postures A
-        score_A += math.ceil(durations[0]/self.total_duration*4)*2
-        if 0 < durations[1] < self.total_duration/4:
+        score_A = 0
+        score_A += math.ceil(durations_A[0]/self.total_duration*4)*2
+        if 0 < durations_A[1] < self.total_duration/4:
             score_A += 7
-        elif durations[1] < self.total_duration/2:
+        elif durations_A[1] < self.total_duration/2:
             score_A += 15
-        elif durations[1] < 3*self.total_duration/4:
+        elif durations_A[1] < 3*self.total_duration/4:
             score_A += 22
-        elif durations[1] >= 3*self.total_duration/4:
+        elif durations_A[1] >= 3*self.total_duration/4:
             score_A += 30
 
-        score_A += math.ceil(durations[2]/self.total_duration*4)*10
-        score_A += math.ceil(durations[3]/self.total_duration*4)*3
-
-        score_B = 0
-        load_index = 0
-        durations = [0]*5 + durations[-1:]   #last duration is for twisting/bending in unfavorable working conditions
-        for posture in postures:
-            load_index = bisect.bisect(load_timestamps,posture["timestamp"],load_index)     #find index of load event closest in time to current posture
-            if load_index >= len(self.loads):
-                load_index -= 1
-            if self.loads[load_index]["weight"] > 3:                                        #ABP score is not considered for loads greater than 3 kg (use LHC instead)
-                continue
-            if "OS" in posture["posture"] or "OH" in posture["posture"]:        #hands above shoulders or head
-                durations[0] += posture["time"]
-            elif int(posture["posture"][-9]) >= 1:   #arms below shoulders level but away from body, #very difficult to detect unsupported arms
-                durations[1] += posture["time"]
-            elif "Ly" in posture["posture"] and ("OH" in posture["posture"] or int(posture["posture"][-9] >= 2)):     #lying on back with hands over head or lying on stomach with hands below body (not sure how to detect last one)
-                durations[2] += posture["time"]
-            if int(posture["posture"][-1]) >= 2 or int(posture["posture"][-5]) >= 2:    #check if severe lateral bending or trunk rotation is present
-                durations[-1] += posture["time"]
+        score_A += math.ceil(durations_A[2]/self.total_duration*4)*10
+        score_A += math.ceil(durations_A[3]/self.total_duration*4)*3
 
         #score for postures B
-        score_B += math.ceil(durations[0]/self.total_duration*4)*10
-        score_B += math.ceil(durations[2]/self.total_duration*4)*7
-
-        score_C = 0
-        load_index = 0
-        durations = [0]*5 + durations[-1:]  #last duration is for twisting/bending in unfavorable working conditions
-        for posture in postures:
-            load_index = bisect.bisect(load_timestamps,posture["timestamp"],load_index)     #find index of load event closest in time to current posture
-            if load_index >= len(self.loads):
-                load_index -= 1
-            if self.loads[load_index]["weight"] > 3:                                        #ABP score is not considered for loads greater than 3 kg (use LHC instead)
-                continue
-            if "St" in posture["posture"]:        #constant standing
-                durations[0] += posture["time"]
-            #very difficult to detect unsupported arms
-            elif "Cr" in posture["posture"]:     #kneeling, squatting or sitting cross-legged (not sure how to detect that last one)
-                durations[2] += posture["time"]
-            if int(posture["posture"][-1]) >= 2 or int(posture["posture"][-5]) >= 2:    #check if severe lateral bending or trunk rotation is present
-                durations[-1] += posture["time"]
+        score_B = 0
+        score_B += math.ceil(durations_B[0]/self.total_duration*4)*10
+        score_B += math.ceil(durations_B[2]/self.total_duration*4)*7
 
         #score for postures C
-        score_C += math.ceil(durations[0]/self.total_duration*4)*2
-        score_C += math.ceil(durations[1]/self.total_duration*4)*10
+        score_C = 0
+        score_C += math.ceil(durations_C[0]/self.total_duration*4)*2
+        score_C += math.ceil(durations_C[1]/self.total_duration*4)*10
 
         posture_score = [score_A, score_B, score_C]
 
         unfavorable_working_conditions = [0,0,0] #[A,B,C]
 
         #score for twisting/lateral bending
-        if 0 < durations[-1] < self.total_duration/4:
+        if 0 < durations_C[-1] < self.total_duration/4:
             unfavorable_working_conditions[0] += 1
-        elif durations[-1] >= self.total_duration/4:
+        elif durations_C[-1] >= self.total_duration/4:
             unfavorable_working_conditions[0] += 2
             unfavorable_working_conditions[2] += 1
 
@@ -133,7 +167,7 @@ class KIMScore:
 
         score = [posture_score[i] + unfavorable_working_conditions[i] + further_working_conditions[i] for i in range(3)]
 
-        self.ABP_score = [time_rating, max(score)]
+        return max(score)
 
 
     def calculate_BM(self):
@@ -155,26 +189,94 @@ class KIMScore:
                 print("reached end")
                 return 0
             end_time = self.postures[index-1]["timestamp"]
-            for i in range(len(self.loads)):
-                if self.loads[i]["time"] >= end_time:
-                    loads = self.loads[:i+1]
-                    break
-                else:
-                    loads = self.loads
+            end_load_indices = np.flatnonzero(self.loads.time >= end_time)
+            if len(end_load_indices):
+                loads = self.loads[:end_load_indices[0]+1]
+            else:
+                loads = self.loads
         else:
             index = len(self.postures)
             loads = self.loads
 
-        for load in loads:
-            if load["frequency"] == 0 and load["duration"] == 0 and load["distance"] == 0:
-                loads.remove(load)
+        #load events without frequency, duration and distance are not considered
+        kept_loads = loads[self.find_kept_loads(loads)]
+        if loads is self.loads:
+            self.loads = kept_loads     #not for the rest of the score either when all load events are used
+        loads = kept_loads
 
-        if not loads:
+        if not len(loads):
             return
        
-        load_rating_points = 0
-        effective_load_weight = max([load["weight"] for load in loads])     #"typical" load weight interpreted as maximum load weight
+        effective_load_weight = float(loads.weight.max())     #"typical" load weight interpreted as maximum load weight
+        load_rating_points = self.calculate_load_rating_points(effective_load_weight)
+
+        load_handling_conditions = 0    #not possible to detect with current sensors (maybe with armband in the future)
+
+        load_handling_postures = self.find_load_handling_postures(loads)
+        posture_points = self.calculate_load_handling_posture_points(load_handling_postures, len(self.loads))
+
+        #determining additional points
+        durations = self.accumulate_additional_durations(index)
+        posture_points += self.calculate_additional_points(durations)
             
+
+        unfavorable_working_conditions = 0  #not possible to detect with current sensors and/or task-specific
+        work_organisation_points = 0    #impossible to detect, task-specific
+        
+        self.LHC_score = [time_rating, load_rating_points + load_handling_conditions + posture_points + unfavorable_working_conditions + work_organisation_points]
+
+    def find_load_handling_postures(self, loads):
+        #list of amount of occurences for each type of start/end postures of the load events
+        return self.find_load_handling_pair_counts(loads).sum(axis=0).tolist()
+
+    def find_load_handling_pair_counts(self, loads):
+        #occurences of each type of start/end postures added by each pair of consecutive load events
+        if len(loads) < 2 or not len(self.postures):
+            return np.zeros((0, 10))
+        posture_indices = np.minimum(np.searchsorted(self.postures.timestamp, loads.time, side="right"), len(self.postures)-1)      #get indices of postures at same time as load events
+        posture_classes = np.array(self.postures.lookup("KIM load handling posture classes", self.find_load_handling_posture_class))[self.postures.code[posture_indices]]
+        return self.find_load_handling_pair_table()[posture_classes[:-1], posture_classes[1:]]
+
+    def find_load_handling_posture_class(self, posture):
+        #which start/end posture types the posture belongs to, as bits: upright, bent forward or hands overhead, strongly bent forward, crouching
+        return int("St_U" in posture) | int("St_BF" in posture or "St_OH" in posture) << 1 | int("St_BS" in posture) << 2 | int("Cr" in posture) << 3
+
+    def find_load_handling_pair_table(self):
+        #occurences added by a load event starting and ending in postures of each pair of classes
+        table = np.zeros((16, 16, 10))
+        for start_class in range(16):
+            for end_class in range(16):
+                self.count_load_handling_postures([start_class, end_class], table[start_class, end_class])
+        return table
+
+    def accumulate_additional_durations(self, index=None):
+        #durations of twisting/lateral bending, arm height, etc. for additional points, of the postures before the index
+        durations = [0]*4
+        additional_flags = self.postures.lookup("KIM additional flags", self.find_additional_flags)
+        episodes = self.get_posture_episodes()
+        if index is not None:
+            episodes = self.postures.cut_episodes(episodes, index)
+        for time, code in zip(episodes.time.tolist(), episodes.code.tolist()):
+            self.accumulate_additional_flags(durations, additional_flags[code], time)
+        return durations
+
+    def find_kept_loads(self, loads):
+        #mask of the load events considered for the LHC score: events without frequency, duration and distance are left out,
+        #except right after a left out event (as when removing them from the list while iterating over it)
+        kept = []
+        skip_next = False
+        for frequency, duration, distance in zip(loads.frequency.tolist(), loads.duration.tolist(), loads.distance.tolist()):
+            if not skip_next and frequency == 0 and duration == 0 and distance == 0:
+                skip_next = True
+                kept.append(False)
+            else:
+                skip_next = False
+                kept.append(True)
+        return np.array(kept, dtype=bool)
+
+    def calculate_load_rating_points(self, effective_load_weight):
+        load_rating_points = 0
+
         #load rating score
         if self.operator_gender == "M":
             if 3 <= effective_load_weight <= 5:
@@ -211,57 +313,59 @@ class KIMScore:
             elif effective_load_weight > 30:
                 load_rating_points = 100
 
-        load_handling_conditions = 0    #not possible to detect with current sensors (maybe with armband in the future)
-
+        return load_rating_points
+
+    def count_load_handling_postures(self, posture_classes, load_handling_postures):
+        #add occurence to type of start/end postures
+        upright = [bool(posture_class & 1) for posture_class in posture_classes]
+        bent_forward = [bool(posture_class & 2) for posture_class in posture_classes]      #or hands overhead
+        strongly_bent_forward = [bool(posture_class & 4) for posture_class in posture_classes]
+        crouching = [bool(posture_class & 8) for posture_class in posture_classes]
+        #permute indices of postures so both can be seen as start or end
+        for i in range(2):
+            #first type gives score of 0, so we can ignore it
+            if upright[i] and bent_forward[1-i]:
+                load_handling_postures[1] += 1
+            elif bent_forward[i] and bent_forward[1-i]:
+                load_handling_postures[2] += 0.5    #will be counted twice because start and end posture are identical
+            elif upright[i] and strongly_bent_forward[1-i]:
+                load_handling_postures[3] += 1
+            elif upright[i] and crouching[1-i]:
+                load_handling_postures[4] += 1
+            elif bent_forward[i] and strongly_bent_forward[1-i]:
+                load_handling_postures[5] += 1
+            elif bent_forward[i] and crouching[1-i]:
+                load_handling_postures[6] += 1
+            elif strongly_bent_forward[i] and strongly_bent_forward[1-i]:
+                load_handling_postures[7] += 0.5    #will be counted twice because start and end posture are identical
+            elif strongly_bent_forward[i] and crouching[1-i]:
+                load_handling_postures[8] += 1
+            elif crouching[i] and crouching[1-i]:
+                load_handling_postures[9] += 0.5    #will be counted twice because start and end posture are identical
+
+    def calculate_load_handling_posture_points(self, load_handling_postures, load_count):
         posture_points = 0
-        
-        posture_index = [0,0]
-        posture_timestamps = [posture["timestamp"] for posture in self.postures]
-        load_handling_postures = [0]*10     #list of amount of occurences for each type of start/end postures
-        for load_index in range(len(loads)-1):
-            #find start and end times of load event and corresponding postures
-            start_and_end_time = [loads[load_index]["time"], loads[load_index+1]["time"]]
-            posture_index = [min(bisect.bisect(posture_timestamps,start_and_end_time[0],posture_index[0]),len(posture_timestamps)-1), min(bisect.bisect(posture_timestamps,start_and_end_time[1],posture_index[1]),len(posture_timestamps)-1)]      #get indices of postures at same time as load events
-            #add occurence to type of start/end postures
-            #permute indices of postures so both can be seen as start or end
-            for i in range(2):
-                #first type gives score of 0, so we can ignore it
-                if ("St_U" in self.postures[posture_index[i]]["posture"]) and ("St_BF" in self.postures[posture_index[1-i]]["posture"] or "St_OH" in self.postures[posture_index[1-i]]["posture"]):
-                    load_handling_postures[1] += 1
-                elif ("St_BF" in self.postures[posture_index[i]]["posture"] or "St_OH" in self.postures[posture_index[i]]["posture"]) and ("St_BF" in self.postures[posture_index[1-i]]["posture"] or "St_OH" in self.postures[posture_index[1-i]]["posture"]):
-                    load_handling_postures[2] += 0.5    #will be counted twice because start and end posture are identical
-                elif ("St_U" in self.postures[posture_index[i]]["posture"]) and ("St_BS" in self.postures[posture_index[1-i]]["posture"]):
-                    load_handling_postures[3] += 1
-                elif ("St_U" in self.postures[posture_index[i]]["posture"]) and ("Cr" in self.postures[posture_index[1-i]]["posture"]):
-                    load_handling_postures[4] += 1
-                elif ("St_BF" in self.postures[posture_index[i]]["posture"] or "St_OH" in self.postures[posture_index[i]]["posture"]) and ("St_BS" in self.postures[posture_index[1-i]]["posture"]):
-                    load_handling_postures[5] += 1
-                elif ("St_BF" in self.postures[posture_index[i]]["posture"] or "St_OH" in self.postures[posture_index[i]]["posture"]) and ("Cr" in self.postures[posture_index[1-i]]["posture"]):
-                    load_handling_postures[6] += 1
-                elif ("St_BS" in self.postures[posture_index[i]]["posture"]) and ("St_BS" in self.postures[posture_index[1-i]]["posture"]):
-                    load_handling_postures[7] += 0.5    #will be counted twice because start and end posture are identical
-                elif ("St_BS" in self.postures[posture_index[i]]["posture"]) and ("Cr" in self.postures[posture_index[1-i]]["posture"]):
-                    load_handling_postures[8] += 1
-                elif ("Cr" in self.postures[posture_index[i]]["posture"]) and ("Cr" in self.postures[posture_index[1-i]]["posture"]):
-                    load_handling_postures[9] += 0.5    #will be counted twice because start and end posture are identical
-        
         points = [0,3,5,7,9,10,13,15,18,20]
         for i in range(1, len(points)):
-            if load_handling_postures[i]/len(self.loads) > 0.1:   #check if posture is regularly held and not a rare deviation (>10% of load_events are with this posture)
+            if load_handling_postures[i]/load_count > 0.1:   #check if posture is regularly held and not a rare deviation (>10% of load_events are with this posture)
                 posture_points += points[i]
-
-        #determining additional points
+        return posture_points
+
+    def find_additional_flags(self, posture):
+        #whether the posture counts for the duration of twisting/lateral bending, hands away from the body, hands between elbow and shoulder height and hands above shoulder height
+        twisting = int(posture[-1]) >= 1 or int(posture[-5]) >= 1     #twisting/lateral bending
+        away_from_body = int(posture[-9]) >= 1     #hands away from the body
+        #very difficult to hands between elbow and shoulder height
+        above_shoulder = "OS" in posture or "OH" in posture    #hands above shoulder height
+        return [twisting, away_from_body, False, above_shoulder]
+
+    def accumulate_additional_flags(self, durations, flags, time):
+        for i in range(len(durations)):
+            if flags[i]:
+                durations[i] += time
+
+    def calculate_additional_points(self, durations):
         additional_points = 0
-        durations = [0]*4   #durations of twisting/lateral bending, arm height, etc. for additional points
-        for posture in self.postures[:index]:
-            if int(posture["posture"][-1]) >= 1 or int(posture["posture"][-5]) >= 1:    #twisting/lateral bending
-                durations[0] += posture["time"]
-            if int(posture["posture"][-9]) >= 1:     #hands away from the body
-                durations[1] += posture["time"]
-            #very difficult to hands between elbow and shoulder height
-            if "OS" in posture["posture"] or "OH" in posture["posture"]:    #hands above shoulder height
-                durations[3] += posture["time"]
-
         if 0 < durations[0] < self.total_duration/4:
             additional_points += 1
         elif durations[0] >= self.total_duration/4:
@@ -282,13 +386,7 @@ class KIMScore:
         elif durations[3] >= self.total_duration/4:
             additional_points += 2
         
-        posture_points += max(6, additional_points)      #additional points can be max 6
-            
-
-        unfavorable_working_conditions = 0  #not possible to detect with current sensors and/or task-specific
-        work_organisation_points = 0    #impossible to detect, task-specific
-        
-        self.LHC_score = [time_rating, load_rating_points + load_handling_conditions + posture_points + unfavorable_working_conditions + work_organisation_points]
+        return max(6, additional_points)      #additional points can be max 6
 
 
     def calculate_PP(self):
@@ -307,4 +405,127 @@ class KIMScore:
             # Calculate the EAWS score as the sum of posture score and other sub-scores
             KIM_score = [self.MHO_score, self.ABP_score, self.BM_score, self.BF_score, self.LHC_score, self.PP_score]
             
-            return KIM_score
\ No newline at end of file
+            return KIM_score
+
+    def calculate_partial_score(self, ABP_durations=None, additional_durations=None):
+        #partial aggregate of this recording, to be merged with those of the other recordings of a shift (see KIMPartialScore)
+        #the durations can be given when the postures were already accumulated together with the EAWS times (see ScoreTimeline)
+        if ABP_durations is None:
+            ABP_durations = self.accumulate_ABP_durations()
+
+        #load events without frequency, duration and distance are not considered
+        kept_loads = self.loads[self.find_kept_loads(self.loads)]
+        max_load_weight = float(kept_loads.weight.max()) if len(kept_loads) else None
+        load_handling_postures = self.find_load_handling_postures(kept_loads)
+        if additional_durations is None:
+            additional_durations = self.accumulate_additional_durations()
+
+        return KIMPartialScore(self.total_duration, ABP_durations, len(kept_loads), max_load_weight, load_handling_postures, additional_durations)
+
+    def calculate_merged_score(self, partial_score):
+        #ABP and LHC scores of the merged partial aggregates, as if they were one recording of their total duration
+        self.total_duration = partial_score.duration
+        durations_A, durations_B, durations_C = partial_score.ABP_durations
+        self.ABP_score = [self.total_duration/3600, self.calculate_ABP_intensity(durations_A, durations_B, durations_C)]
+
+        if partial_score.load_count:
+            time_rating = self.calculate_nonlinear_time_rating(self.total_duration/60)
+            load_rating_points = self.calculate_load_rating_points(partial_score.max_load_weight)
+            load_handling_conditions = 0
+            posture_points = self.calculate_load_handling_posture_points(partial_score.load_handling_postures, partial_score.load_count)
+            posture_points += self.calculate_additional_points(partial_score.additional_durations)
+            unfavorable_working_conditions = 0
+            work_organisation_points = 0
+            self.LHC_score = [time_rating, load_rating_points + load_handling_conditions + posture_points + unfavorable_working_conditions + work_organisation_points]
+        else:
+            self.LHC_score = [0,0]
+        return self.calculate_KIM_score()
+
+    def calculate_KIM_timeline(self):
+        # Calculate the intermediate KIM scores at every posture index in a single pass over the posture and load arrays.
+        # Gives the same values as calling calculate_LHC(loads, index) and calculate_intermediate_KIM_score(timestamp, index) for each index.
+        timeline = []
+        if not len(self.postures):
+            return timeline
+
+        ABP_time_rating = self.total_duration/3600
+        LHC_time_rating = self.calculate_nonlinear_time_rating(self.total_duration/60)
+
+        #load events kept by calculate_LHC
+        kept = self.find_kept_loads(self.loads)
+        kept_load_counts = np.cumsum(kept).tolist()     #number of kept load events among the first i+1 load events
+        max_weights = np.maximum.accumulate(self.loads.weight[kept]).tolist()   #"typical" load weight of the first i+1 kept load events
+        kept_count = len(max_weights)
+
+        #occurences of each type of start/end postures for the first i+1 kept load events
+        pair_counts = self.find_load_handling_pair_counts(self.loads[kept])
+        cumulative_load_handling_postures = np.cumsum(np.vstack([np.zeros((1, 10)), pair_counts]), axis=0).tolist()
+
+        #calculate_ABP looks up heavy loads in all load events, or in the kept load events when calculate_LHC used all of them
+        heavy_load_postures = [self.get_load_intervals().heavy_load_postures.tolist(), LoadIntervals(self.loads[kept], self.postures).heavy_load_postures.tolist()]
+        ABP_durations = [[[0]*6, [0]*6, [0]*6] for i in range(2)]      #durations for postures A, B and C
+        twisting_durations = [0, 0]
+        additional_durations = [0]*4
+
+        #posture categories, twisting and additional duration flags of each distinct posture
+        ABP_categories = self.postures.lookup("KIM ABP categories", self.find_ABP_posture_categories)
+        additional_flags = self.postures.lookup("KIM additional flags", self.find_additional_flags)
+
+        #loads up to and including the first load event at or after the previous posture (index 0 wraps around to the last posture)
+        end_load_indices = np.searchsorted(self.loads.time, np.roll(self.postures.timestamp, 1), side="left").tolist()
+
+        for index, (time, code) in enumerate(zip(self.postures.time.tolist(), self.postures.code.tolist())):
+            all_loads = end_load_indices[index] >= len(self.loads)
+
+            kept_load_count = kept_count if all_loads else kept_load_counts[end_load_indices[index]]
+            if kept_load_count:
+                load_rating_points = self.calculate_load_rating_points(max_weights[kept_load_count-1])
+                load_handling_conditions = 0
+                posture_points = self.calculate_load_handling_posture_points(cumulative_load_handling_postures[kept_load_count-1], kept_count if all_loads else len(self.loads))
+                posture_points += self.calculate_additional_points(additional_durations)
+                unfavorable_working_conditions = 0
+                work_organisation_points = 0
+                LHC_score = [LHC_time_rating, load_rating_points + load_handling_conditions + posture_points + unfavorable_working_conditions + work_organisation_points]
+            else:
+                LHC_score = [0,0]
+
+            durations_A, durations_B, durations_C = ABP_durations[int(all_loads)]
+            #calculate_ABP keeps adding to the twisting/bending duration in each of its three passes
+            durations_C = durations_C[:-1] + [3*twisting_durations[int(all_loads)]]
+            ABP_score = [ABP_time_rating, self.calculate_ABP_intensity(durations_A, durations_B, durations_C)]
+
+            timeline.append([list(self.MHO_score), ABP_score, list(self.BM_score), list(self.BF_score), LHC_score, list(self.PP_score)])
+
+            #add current posture to the durations of the next index
+            self.accumulate_additional_flags(additional_durations, additional_flags[code], time)
+            for i in range(2):
+                if heavy_load_postures[i][index]:
+                    continue
+                for posture_group in range(3):
+                    category, twisting = ABP_categories[code][posture_group]
+                    if category is not None:
+                        ABP_durations[i][posture_group][category] += time
+                if twisting:
+                    twisting_durations[i] += time
+
+        return timeline
+
+class KIMPartialScore:
+    #sums over the postures and load events of one part of a shift (a recording or a time chunk of one), which can be merged in any grouping.
+    #load handling postures are paired and load events are kept or left out within each part.
+    def __init__(self, duration, ABP_durations, load_count, max_load_weight, load_handling_postures, additional_durations):
+        self.duration = duration                                # seconds
+        self.ABP_durations = ABP_durations                      # durations of the categories of postures A, B and C, twisting/bending last
+        self.load_count = load_count                            # number of load events considered for the LHC score
+        self.max_load_weight = max_load_weight                  # kg, None without load events
+        self.load_handling_postures = load_handling_postures    # occurences of each type of start/end postures
+        self.additional_durations = additional_durations        # durations for the LHC additional points
+
+    def merge(self, other):
+        max_load_weights = [weight for weight in [self.max_load_weight, other.max_load_weight] if weight is not None]
+        return KIMPartialScore(self.duration + other.duration,
+                               [[a + b for a, b in zip(durations, other_durations)] for durations, other_durations in zip(self.ABP_durations, other.ABP_durations)],
+                               self.load_count + other.load_count,
+                               max(max_load_weights) if max_load_weights else None,
+                               [a + b for a, b in zip(self.load_handling_postures, other.load_handling_postures)],
+                               [a + b for a, b in zip(self.additional_durations, other.additional_durations)])
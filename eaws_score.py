@@ -1,4 +1,84 @@
 import bisect
+import numpy as np
+from recording_data import LoadIntervals
+
+#EAWS postures score A: points per posture type (row, 0 for unknown postures) for each step of duration_s_min (min per shift, normalised to 8 h)
+#steps start at the durations below, the first step is below 3 min
+SCORE_A_DURATIONS = [3, 4.5, 6, 9, 12, 16, 20, 30, 40, 50]
+SCORE_A_POINTS = [
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0.5, 1, 1, 1, 1.5, 2],              #1 standing upright
+    [0, 0.7, 1, 1.5, 2, 3, 4, 6, 8, 11, 13],            #2
+    [0, 2, 3, 5, 7, 9.5, 12, 18, 23, 32, 40],           #3 standing bent forward
+    [0, 3.3, 5, 8.5, 12, 17, 21, 30, 38, 51, 63],       #4 standing strongly bent forward
+    [0, 3.3, 5, 8.5, 12, 17, 21, 30, 38, 51, 63],       #5 standing with hands above shoulders
+    [0, 5.3, 8, 14, 19, 26, 33, 47, 60, 80, 100],       #6 standing with hands above head
+    [0, 0, 0, 0, 0, 0, 0, 0.5, 1, 1.5, 2],              #7
+    [0, 0, 0, 0.5, 1, 1.5, 2, 3, 4, 5.5, 7],            #8
+    [0, 0.7, 1, 1.5, 2, 3, 4, 6, 8, 11, 13],            #9
+    [0, 2.7, 4, 7, 10, 13, 16, 23, 30, 40, 50],         #10
+    [0, 4, 6, 10, 14, 20, 25, 35, 45, 60, 75],          #11
+    [0, 3.3, 5, 7, 9, 12, 15, 21, 27, 36, 45],          #12 crouching upright
+    [0, 4, 6, 10, 14, 20, 25, 35, 45, 60, 75],          #13 crouching bent forward
+    [0, 3.3, 5, 8.5, 12, 17, 21, 30, 38, 51, 63],       #14 crouching with hands above shoulders
+    [0, 6, 9, 15, 21, 29, 37, 53, 68, 91, 113],         #15 lying
+    [0, 6.7, 10, 22, 33, 50, 66, 66, 66, 66, 66],       #16
+]
+SCORE_A_POINTS_ARRAY = np.array(SCORE_A_POINTS, dtype=float)
+
+#EAWS postures score B: points for far reach and asymmetry (trunk rotation, lateral bending) per step of duration_s_min
+#(only the first step is reached, the longer durations come after duration_s >= 4 in the original if-chains)
+FAR_REACH_DURATIONS = [4]
+FAR_REACH_POINTS = [0, 1]
+ASSYM_DURATIONS = [4]
+ASSYM_POINTS = [0, 1.5]
+
+#EAWS load handling: load points per step of weight (kg) for lifting, holding and carrying, and per transport type for pushing and pulling
+LOAD_POINTS = {
+    "M": {
+        "lift": ([3, 10, 15, 20, 25, 30, 35, 40], [0, 1, 1.5, 2, 3, 4, 10, 17, 25]),
+        "wheelbarrow": ([50, 75, 100, 150, 200, 250], [0, 0.5, 1, 1.5, 2, 3, 4]),
+        "carriage": ([50, 75, 100, 150, 250, 350, 550], [0, 0.5, 1, 1.5, 2, 3, 4, 5]),
+        "cart": ([50, 75, 150, 250, 350, 500, 600, 800, 1250], [0, 0.5, 1, 1.5, 2, 3, 4, 5, 6, 8]),
+    },
+    "F": {
+        "lift": ([2, 5, 7, 10, 12, 15, 20, 25], [0, 1, 1.5, 2, 3, 4, 5.5, 7, 25]),
+        "wheelbarrow": ([40, 60, 80, 115, 155, 195], [0, 0.5, 1, 1.5, 2, 3, 4]),
+        "carriage": ([40, 60, 80, 115, 195, 270, 425], [0, 0.5, 1, 1.5, 2, 3, 4, 5]),
+        "cart": ([40, 60, 115, 195, 270, 385, 460, 615, 960], [0, 0.5, 1, 1.5, 2, 3, 4, 5, 6, 8]),
+    },
+}
+#duration factor per step of frequency (#/shift), distance (m/shift) or duration (min/shift)
+DURATION_FACTORS = {
+    "frequency": ([5, 25, 120, 350, 750, 1000, 1500, 2000, 2500, 3000], [0, 1, 2, 4, 6, 8, 10, 11, 13, 14, 15]),
+    "distance": ([300, 650, 2500, 6000, 12000, 16000], [0, 1, 2, 4, 6, 8, 10]),
+    "duration": ([2.5, 10, 37, 90, 180, 240], [0, 1, 2, 4, 6, 8, 10]),
+}
+#load points table ("push_pull" depends on the transport type) and duration factor of each load type
+LOAD_TYPES = {
+    "repositioning": ("lift", "frequency"),
+    "carrying": ("lift", "distance"),
+    "holding": ("lift", "duration"),
+    "push_pull_short": ("push_pull", "frequency"),
+    "push_pull_long": ("push_pull", "distance"),
+}
+
+#EAWS whole body extra points: points per step of frequency (0c: from 1, above 2, 5, 10 and 20; 0d: from 1, 8, 11, 16 and 20) or duration (0d: from 3, 10, 20, 40 and 60)
+EXTRA_0C_FREQUENCIES = [2, 5, 10, 20]
+EXTRA_0C_POINTS = [0, 1, 2.5, 4, 6, 8]
+EXTRA_0D_FREQUENCIES = [1, 8, 11, 16, 20]
+EXTRA_0D_DURATIONS = [3, 10, 20, 40, 60]
+EXTRA_0D_POINTS = [0, 2, 2.5, 4, 6, 8]
+#extra points categories used when none are given, could be passed by production context
+#0d (joint position wrist) could be detected from hum_joint_angles
+DEFAULT_EXTRA_LOADS = [
+    {"type": "0a", "intensity": 0},
+    {"type": "0b", "intensity": 0},
+    {"type": "0c", "intensity": 0, "frequency": 0},
+    {"type": "0d", "intensity": 0, "frequency": 0},
+    {"type": "0e", "intensity": 0},
+]
+
 
 
 class EAWSScore:
@@ -31,57 +111,51 @@ class EAWSScore:
                     # For load types 0a, 0b, and 0e, calculate intensity
                     self.whole_body_extra_points += intensity
                 elif load_type == "0c":
-                    # Calculate score based on frequency mapping
+                    # Calculate score based on frequency mapping (below 1, up to 2, up to 5, ...)
                     if frequency < 1:
-                        score = 0
-                    elif 1 <= frequency <= 2:
-                        score = 1
-                    elif 2 < frequency <= 5:
-                        score = 2.5
-                    elif 5 < frequency <= 10:
-                        score = 4
-                    elif 10 < frequency <= 20:
-                        score = 6
+                        score = EXTRA_0C_POINTS[0]
                     else:
-                        score = 8
+                        score = EXTRA_0C_POINTS[1 + bisect.bisect_left(EXTRA_0C_FREQUENCIES, frequency)]
                     # Add score multiplied by intensity to whole_body_extra_points
                     self.whole_body_extra_points += score * intensity
                 elif load_type == "0d":
                     # If frequency provided, calculate score based on frequency mapping
                     if frequency:
-                        if frequency < 1:
-                            score = 0
-                        elif 1 <= frequency < 8:
-                            score = 2
-                        elif 8 <= frequency < 11:
-                            score = 2.5
-                        elif 11 <= frequency < 16:
-                            score = 4
-                        elif 16 <= frequency < 20:
-                            score = 6
-                        else:
-                            score = 8
+                        score = EXTRA_0D_POINTS[bisect.bisect_right(EXTRA_0D_FREQUENCIES, frequency)]
                     # If duration provided, calculate score based on duration mapping
                     else:
                         duration = load.get("duration", 0)
-                        if duration < 3:
-                            score = 0
-                        elif 3 <= duration < 10:
-                            score = 2
-                        elif 10 <= duration < 20:
-                            score = 2.5
-                        elif 20 <= duration < 40:
-                            score = 4
-                        elif 40 <= duration < 60:
-                            score = 6
-                        else:
-                            score = 8
+                        score = EXTRA_0D_POINTS[bisect.bisect_right(EXTRA_0D_DURATIONS, duration)]
                     # Add score multiplied by intensity to whole_body_extra_points
                     self.whole_body_extra_points += score * intensity
                 else:
                     raise ValueError("Unknown load type")
 
 
+    def calculate_whole_body_extra_points_array(self, extra_loads):
+        # Whole body extra points for a batch of scenarios at once: the intensity, frequency and duration of each extra load
+        # can be arrays with one value per scenario (or single values shared by all scenarios)
+        whole_body_extra_points = np.zeros(1)
+        for load in extra_loads:
+            load_type = load["type"]
+            intensity = np.asarray(load.get("intensity", 0), dtype=float)
+            frequency = np.asarray(load.get("frequency", 0), dtype=float)
+
+            if load_type == "0a" or load_type == "0b" or load_type == "0e":
+                whole_body_extra_points = whole_body_extra_points + intensity
+            elif load_type == "0c":
+                score = np.where(frequency < 1, EXTRA_0C_POINTS[0], np.array(EXTRA_0C_POINTS, dtype=float)[1 + np.searchsorted(EXTRA_0C_FREQUENCIES, frequency, side="left")])
+                whole_body_extra_points = whole_body_extra_points + score * intensity
+            elif load_type == "0d":
+                duration = np.asarray(load.get("duration", 0), dtype=float)
+                score = np.where(frequency != 0,
+                                 np.array(EXTRA_0D_POINTS, dtype=float)[np.searchsorted(EXTRA_0D_FREQUENCIES, frequency, side="right")],
+                                 np.array(EXTRA_0D_POINTS, dtype=float)[np.searchsorted(EXTRA_0D_DURATIONS, duration, side="right")])
+                whole_body_extra_points = whole_body_extra_points + score * intensity
+            else:
+                raise ValueError("Unknown load type")
+        return whole_body_extra_points
+
     def find_posture_type(self, posture_string):
         posture_map = {
             "St_U": 1,
@@ -102,71 +176,92 @@ class EAWSScore:
     
         return None  # Return None if no key is found in posture_string
 
+    def get_load_intervals(self):
+        #closest load event of each posture, usually found once when the recording is loaded
+        if self.loads.intervals is None:
+            self.loads.intervals = LoadIntervals(self.loads, self.postures)
+        return self.loads.intervals
+
+    def get_posture_episodes(self):
+        #runs of the same posture and closest load event, usually found once when the recording is loaded
+        if self.postures.episodes is None:
+            return self.postures.find_episodes(self.loads.time)
+        return self.postures.episodes
+
     def calculate_posture_score(self, duration=None, index=None):
                 
         self.postures_score = 0
 
-       # Initialize dictionaries to store accumulated times for prefixes, FRX groups, TRX groups, and LBX groups
-        accumulated_times_prefix = {}
-        accumulated_times_FRX = {}
-        accumulated_times_TRX = {}
-        accumulated_times_LBX = {}
-
         if duration is None:
             duration = self.total_duration
 
-        load_timestamps = [load["time"] for load in self.loads]
+        accumulated_times = self.accumulate_posture_times(index)
 
-        load_index = 0
-        index_counter = 0
-        # Iterate over the posture data to accumulate time for each prefix, FRX group, TRX group, and LBX group
-        for entry in self.postures:
-            posture = entry['posture']
-            time = entry['time']
+        # Add the total posture score to the cumulative total score
+        self.postures_score += self.calculate_accumulated_posture_score(accumulated_times, duration)
 
-            # Check if the entry time exceeds the duration (if provided)
-            if(index is not None):
-                if index_counter > index:
-                    break
-            
-            load_index = bisect.bisect(load_timestamps,entry["timestamp"],load_index)     #find index of load event closest in time to current posture
-            if load_index >= len(self.loads):
-                load_index -= 1
-            if self.loads[load_index]["weight"] > 3:                                        #posture score is not considered for loads greater than 3 kg (use handled loads instead)
-                continue
-            
-            # Extract the prefix, TRX group, and LBX group from the posture
-            prefix = '_'.join(posture.split('_')[:2])
-            FRX_group = posture.split('_')[-3]
-            TRX_group = posture.split('_')[-2]
-            LBX_group = posture.split('_')[-1]
-            
-            # Accumulate time for each prefix
-            if prefix not in accumulated_times_prefix:
-                accumulated_times_prefix[prefix] = 0
-            accumulated_times_prefix[prefix] += time
-            
-            # Accumulate time for each FRX group
-            if FRX_group not in accumulated_times_FRX:
-                accumulated_times_FRX[FRX_group] = 0
-            accumulated_times_FRX[FRX_group] += time
-
-            # Accumulate time for each TRX group
-            if TRX_group not in accumulated_times_TRX:
-                accumulated_times_TRX[TRX_group] = 0
-            accumulated_times_TRX[TRX_group] += time
-
-            # Accumulate time for each TRX group
-            if TRX_group not in accumulated_times_TRX:
-                accumulated_times_TRX[TRX_group] = 0
-            accumulated_times_TRX[TRX_group] += time
-            
-            # Accumulate time for each LBX group
-            if LBX_group not in accumulated_times_LBX:
-                accumulated_times_LBX[LBX_group] = 0
-            accumulated_times_LBX[LBX_group] += time
+    def accumulate_posture_times(self, index=None):
+       # Initialize dictionaries to store accumulated times for prefixes, FRX groups, TRX groups, and LBX groups
+        accumulated_times = [{}, {}, {}, {}]
 
-            index_counter += 1
+        scored = ~self.get_load_intervals().heavy_load_postures     #posture score is not considered for loads greater than 3 kg (use handled loads instead)
+
+        # Only the first index+1 scored postures are accumulated (if provided)
+        episodes = self.get_posture_episodes()
+        if index is not None:
+            scored_indices = np.flatnonzero(scored)
+            if index < len(scored_indices):
+                episodes = self.postures.cut_episodes(episodes, scored_indices[index]+1)
+
+        posture_groups = self.postures.lookup("EAWS posture groups", self.find_posture_groups)
+
+        # Iterate over the posture episodes to accumulate time for each prefix, FRX group, TRX group, and LBX group
+        # (the closest load event does not change within an episode, so neither does the exclusion)
+        for code, time, is_scored in zip(episodes.code.tolist(), episodes.time.tolist(), scored[episodes.start].tolist()):
+            if is_scored:
+                self.accumulate_posture_groups(accumulated_times, posture_groups[code], time)
+
+        return accumulated_times
+
+    def find_posture_groups(self, posture):
+        # Extract the prefix, FRX group, TRX group, and LBX group from the posture
+        prefix = '_'.join(posture.split('_')[:2])
+        FRX_group = posture.split('_')[-3]
+        TRX_group = posture.split('_')[-2]
+        LBX_group = posture.split('_')[-1]
+        return prefix, FRX_group, TRX_group, LBX_group
+
+    def accumulate_posture_groups(self, accumulated_times, posture_groups, time):
+        accumulated_times_prefix, accumulated_times_FRX, accumulated_times_TRX, accumulated_times_LBX = accumulated_times
+        prefix, FRX_group, TRX_group, LBX_group = posture_groups
+        
+        # Accumulate time for each prefix
+        if prefix not in accumulated_times_prefix:
+            accumulated_times_prefix[prefix] = 0
+        accumulated_times_prefix[prefix] += time
+        
+        # Accumulate time for each FRX group
+        if FRX_group not in accumulated_times_FRX:
+            accumulated_times_FRX[FRX_group] = 0
+        accumulated_times_FRX[FRX_group] += time
+
+        # Accumulate time for each TRX group
+        if TRX_group not in accumulated_times_TRX:
+            accumulated_times_TRX[TRX_group] = 0
+        accumulated_times_TRX[TRX_group] += time
+
+        # Accumulate time for each TRX group
+        if TRX_group not in accumulated_times_TRX:
+            accumulated_times_TRX[TRX_group] = 0
+        accumulated_times_TRX[TRX_group] += time
+        
+        # Accumulate time for each LBX group
+        if LBX_group not in accumulated_times_LBX:
+            accumulated_times_LBX[LBX_group] = 0
+        accumulated_times_LBX[LBX_group] += time
+
+    def calculate_accumulated_posture_score(self, accumulated_times, duration):
+        accumulated_times_prefix, accumulated_times_FRX, accumulated_times_TRX, accumulated_times_LBX = accumulated_times
 
         # Convert accumulated time dictionaries to lists of dictionaries
         posture_data_A = [{'time': time, 'posture': prefix} for prefix, time in accumulated_times_prefix.items()]
@@ -206,448 +301,40 @@ class EAWSScore:
             duration_s_min = posture['time'] * 60 / duration
 
             score_B = score_B + int(posture['posture'][-1])*self.assym_duration(duration_s_min)
-            
-        # Add the total posture score to the cumulative total score
-        self.postures_score += score_A + score_B
+
+        return score_A + score_B
         
     def assym_duration(self, duration_s):
-        
-        if(duration_s >= 4):
-            return 1.5
-        elif(duration_s >= 10):
-            return 2.5
-        elif(duration_s >= 13):
-            return 3
-        
-        return 0
+        return ASSYM_POINTS[bisect.bisect_right(ASSYM_DURATIONS, duration_s)]
     
     def far_reach_duration(self, duration_s):
-        
-        if(duration_s >= 4):
-            return 1
-        elif(duration_s >= 10):
-            return 1.5
-        elif(duration_s >= 13):
-            return 2
-        
-        return 0
+        return FAR_REACH_POINTS[bisect.bisect_right(FAR_REACH_DURATIONS, duration_s)]
 
     def calculate_score_A(self, posture_type, duration_s_min):
-        score_A = 0
         # Calculate score A based on posture type and duration_s_min
-        if posture_type == 1:
-            score_A = self.calculate_score_A_type_1(duration_s_min)
-        elif posture_type == 2:
-            score_A = self.calculate_score_A_type_2(duration_s_min)
-        elif posture_type == 3:
-            score_A = self.calculate_score_A_type_3(duration_s_min)
-        elif posture_type == 4:
-            score_A = self.calculate_score_A_type_4(duration_s_min)
-        elif posture_type == 5:
-            score_A = self.calculate_score_A_type_5(duration_s_min)
-        elif posture_type == 6:
-            score_A = self.calculate_score_A_type_6(duration_s_min)
-        elif posture_type == 7:
-            score_A = self.calculate_score_A_type_7(duration_s_min)
-        elif posture_type == 8:
-            score_A = self.calculate_score_A_type_8(duration_s_min)
-        elif posture_type == 9:
-            score_A = self.calculate_score_A_type_9(duration_s_min)
-        elif posture_type == 10:
-            score_A = self.calculate_score_A_type_10(duration_s_min)
-        elif posture_type == 11:
-            score_A = self.calculate_score_A_type_11(duration_s_min)
-        elif posture_type == 12:
-            score_A = self.calculate_score_A_type_12(duration_s_min)
-        elif posture_type == 13:
-            score_A = self.calculate_score_A_type_13(duration_s_min)
-        elif posture_type == 14:
-            score_A = self.calculate_score_A_type_14(duration_s_min)
-        elif posture_type == 15:
-            score_A = self.calculate_score_A_type_15(duration_s_min)
-        elif posture_type == 16:
-            score_A = self.calculate_score_A_type_16(duration_s_min)
-
-        return score_A
-
-    def calculate_score_A_type_1(self, duration_s_min):
-        if duration_s_min < 12:
-            return 0
-        elif 12 <= duration_s_min < 16:
-            return 0.5
-        elif 16 <= duration_s_min < 20:
-            return 1
-        elif 20 <= duration_s_min < 30:
-            return 1
-        elif 30 <= duration_s_min < 40:
-            return 1
-        elif 40 <= duration_s_min < 50:
-            return 1.5
-        else:
-            return 2
-
-    def calculate_score_A_type_2(self, duration_s_min):
-        if duration_s_min < 3:
-            return 0
-        elif 3 <= duration_s_min < 4.5:
-            return 0.7
-        elif 4.5 <= duration_s_min < 6:
-            return 1
-        elif 6 <= duration_s_min < 9:
-            return 1.5
-        elif 9 <= duration_s_min < 12:
-            return 2
-        elif 12 <= duration_s_min < 16:
-            return 3
-        elif 16 <= duration_s_min < 20:
-            return 4
-        elif 20 <= duration_s_min < 30:
-            return 6
-        elif 30 <= duration_s_min < 40:
-            return 8
-        elif 40 <= duration_s_min < 50:
-            return 11
-        else:
-            return 13
-
-    def calculate_score_A_type_3(self, duration_s_min):
-        if duration_s_min < 3:
-            return 0
-        elif 3 <= duration_s_min < 4.5:
-            return 2
-        elif 4.5 <= duration_s_min < 6:
-            return 3
-        elif 6 <= duration_s_min < 9:
-            return 5
-        elif 9 <= duration_s_min < 12:
-            return 7
-        elif 12 <= duration_s_min < 16:
-            return 9.5
-        elif 16 <= duration_s_min < 20:
-            return 12
-        elif 20 <= duration_s_min < 30:
-            return 18
-        elif 30 <= duration_s_min < 40:
-            return 23
-        elif 40 <= duration_s_min < 50:
-            return 32
-        else:
-            return 40
-        
-    def calculate_score_A_type_4(self, duration_s_min):
-        if duration_s_min < 3:
-            return 0
-        elif 3 <= duration_s_min < 4.5:
-            return 3.3
-        elif 4.5 <= duration_s_min < 6:
-            return 5
-        elif 6 <= duration_s_min < 9:
-            return 8.5
-        elif 9 <= duration_s_min < 12:
-            return 12
-        elif 12 <= duration_s_min < 16:
-            return 17
-        elif 16 <= duration_s_min < 20:
-            return 21
-        elif 20 <= duration_s_min < 30:
-            return 30
-        elif 30 <= duration_s_min < 40:
-            return 38
-        elif 40 <= duration_s_min < 50:
-            return 51
-        else:
-            return 63
+        return SCORE_A_POINTS[posture_type or 0][bisect.bisect_right(SCORE_A_DURATIONS, duration_s_min)]
 
-    def calculate_score_A_type_5(self, duration_s_min):
-        if duration_s_min < 3:
-            return 0
-        elif 3 <= duration_s_min < 4.5:
-            return 3.3
-        elif 4.5 <= duration_s_min < 6:
-            return 5
-        elif 6 <= duration_s_min < 9:
-            return 8.5
-        elif 9 <= duration_s_min < 12:
-            return 12
-        elif 12 <= duration_s_min < 16:
-            return 17
-        elif 16 <= duration_s_min < 20:
-            return 21
-        elif 20 <= duration_s_min < 30:
-            return 30
-        elif 30 <= duration_s_min < 40:
-            return 38
-        elif 40 <= duration_s_min < 50:
-            return 51
-        else:
-            return 63
+    def assym_duration_array(self, durations_s):
+        return np.array(ASSYM_POINTS, dtype=float)[np.searchsorted(ASSYM_DURATIONS, durations_s, side="right")]
 
-    def calculate_score_A_type_6(self, duration_s_min):
-        if duration_s_min < 3:
-            return 0
-        elif 3 <= duration_s_min < 4.5:
-            return 5.3
-        elif 4.5 <= duration_s_min < 6:
-            return 8
-        elif 6 <= duration_s_min < 9:
-            return 14
-        elif 9 <= duration_s_min < 12:
-            return 19
-        elif 12 <= duration_s_min < 16:
-            return 26
-        elif 16 <= duration_s_min < 20:
-            return 33
-        elif 20 <= duration_s_min < 30:
-            return 47
-        elif 30 <= duration_s_min < 40:
-            return 60
-        elif 40 <= duration_s_min < 50:
-            return 80
-        else:
-            return 100
+    def far_reach_duration_array(self, durations_s):
+        return np.array(FAR_REACH_POINTS, dtype=float)[np.searchsorted(FAR_REACH_DURATIONS, durations_s, side="right")]
 
-    def calculate_score_A_type_7(self, duration_s_min):
-        if duration_s_min < 20:
-            return 0
-        elif 20 <= duration_s_min < 30:
-            return 0.5
-        elif 30 <= duration_s_min < 40:
-            return 1
-        elif 40 <= duration_s_min < 50:
-            return 1.5
-        elif duration_s_min >= 50:
-            return 2
-
-    def calculate_score_A_type_8(self, duration_s_min):
-        if duration_s_min < 6:
-            return 0
-        elif 6 <= duration_s_min < 9:
-            return 0.5
-        elif 9 <= duration_s_min < 12:
-            return 1
-        elif 12 <= duration_s_min < 16:
-            return 1.5
-        elif 16 <= duration_s_min < 20:
-            return 2
-        elif 20 <= duration_s_min < 30:
-            return 3
-        elif 30 <= duration_s_min < 40:
-            return 4
-        elif 40 <= duration_s_min < 50:
-            return 5.5
-        elif duration_s_min >= 50:
-            return 7
-        
-    # Score A calculations for each posture type
-    def calculate_score_A_type_9(self, duration_s_min):
-        if duration_s_min < 3:
-            score_A = 0
-        elif 3 <= duration_s_min < 4.5:
-            score_A = 0.7
-        elif 4.5 <= duration_s_min < 6:
-            score_A = 1
-        elif 6 <= duration_s_min < 9:
-            score_A = 1.5
-        elif 9 <= duration_s_min < 12:
-            score_A = 2
-        elif 12 <= duration_s_min < 16:
-            score_A = 3
-        elif 16 <= duration_s_min < 20:
-            score_A = 4
-        elif 20 <= duration_s_min < 30:
-            score_A = 6
-        elif 30 <= duration_s_min < 40:
-            score_A = 8
-        elif 40 <= duration_s_min < 50:
-            score_A = 11
-        else:
-            score_A = 13
-        return score_A
-
-    # Score A calculations for each posture type
-    def calculate_score_A_type_10(self, duration_s_min):
-        if duration_s_min < 3:
-            score_A = 0
-        elif 3 <= duration_s_min < 4.5:
-            score_A = 2.7
-        elif 4.5 <= duration_s_min < 6:
-            score_A = 4
-        elif 6 <= duration_s_min < 9:
-            score_A = 7
-        elif 9 <= duration_s_min < 12:
-            score_A = 10
-        elif 12 <= duration_s_min < 16:
-            score_A = 13
-        elif 16 <= duration_s_min < 20:
-            score_A = 16
-        elif 20 <= duration_s_min < 30:
-            score_A = 23
-        elif 30 <= duration_s_min < 40:
-            score_A = 30
-        elif 40 <= duration_s_min < 50:
-            score_A = 40
-        else:
-            score_A = 50
-        return score_A
-
-    # Score A calculations for each posture type
-    def calculate_score_A_type_11(self, duration_s_min):
-        if duration_s_min < 3:
-            score_A = 0
-        elif 3 <= duration_s_min < 4.5:
-            score_A = 4
-        elif 4.5 <= duration_s_min < 6:
-            score_A = 6
-        elif 6 <= duration_s_min < 9:
-            score_A = 10
-        elif 9 <= duration_s_min < 12:
-            score_A = 14
-        elif 12 <= duration_s_min < 16:
-            score_A = 20
-        elif 16 <= duration_s_min < 20:
-            score_A = 25
-        elif 20 <= duration_s_min < 30:
-            score_A = 35
-        elif 30 <= duration_s_min < 40:
-            score_A = 45
-        elif 40 <= duration_s_min < 50:
-            score_A = 60
-        else:
-            score_A = 75
-        return score_A
-
-    # Score A calculations for each posture type
-    def calculate_score_A_type_12(self, duration_s_min):
-        if duration_s_min < 3:
-            score_A = 0
-        elif 3 <= duration_s_min < 4.5:
-            score_A = 3.3
-        elif 4.5 <= duration_s_min < 6:
-            score_A = 5
-        elif 6 <= duration_s_min < 9:
-            score_A = 7
-        elif 9 <= duration_s_min < 12:
-            score_A = 9
-        elif 12 <= duration_s_min < 16:
-            score_A = 12
-        elif 16 <= duration_s_min < 20:
-            score_A = 15
-        elif 20 <= duration_s_min < 30:
-            score_A = 21
-        elif 30 <= duration_s_min < 40:
-            score_A = 27
-        elif 40 <= duration_s_min < 50:
-            score_A = 36
-        else:
-            score_A = 45
-        return score_A
-
-    # Score A calculations for each posture type
-    def calculate_score_A_type_13(self, duration_s_min):
-        if duration_s_min < 3:
-            score_A = 0
-        elif 3 <= duration_s_min < 4.5:
-            score_A = 4
-        elif 4.5 <= duration_s_min < 6:
-            score_A = 6
-        elif 6 <= duration_s_min < 9:
-            score_A = 10
-        elif 9 <= duration_s_min < 12:
-            score_A = 14
-        elif 12 <= duration_s_min < 16:
-            score_A = 20
-        elif 16 <= duration_s_min < 20:
-            score_A = 25
-        elif 20 <= duration_s_min < 30:
-            score_A = 35
-        elif 30 <= duration_s_min < 40:
-            score_A = 45
-        elif 40 <= duration_s_min < 50:
-            score_A = 60
-        else:
-            score_A = 75
-        return score_A
-
-    # Score A calculations for each posture type
-    def calculate_score_A_type_14(self, duration_s_min):
-        if duration_s_min < 3:
-            score_A = 0
-        elif 3 <= duration_s_min < 4.5:
-            score_A = 3.3
-        elif 4.5 <= duration_s_min < 6:
-            score_A = 5
-        elif 6 <= duration_s_min < 9:
-            score_A = 8.5
-        elif 9 <= duration_s_min < 12:
-            score_A = 12
-        elif 12 <= duration_s_min < 16:
-            score_A = 17
-        elif 16 <= duration_s_min < 20:
-            score_A = 21
-        elif 20 <= duration_s_min < 30:
-            score_A = 30
-        elif 30 <= duration_s_min < 40:
-            score_A = 38
-        elif 40 <= duration_s_min < 50:
-            score_A = 51
-        else:
-            score_A = 63
-        return score_A
-
-    # Score A calculations for each posture type
-    def calculate_score_A_type_15(self, duration_s_min):
-        if duration_s_min < 3:
-            score_A = 0
-        elif 3 <= duration_s_min < 4.5:
-            score_A = 6
-        elif 4.5 <= duration_s_min < 6:
-            score_A = 9
-        elif 6 <= duration_s_min < 9:
-            score_A = 15
-        elif 9 <= duration_s_min < 12:
-            score_A = 21
-        elif 12 <= duration_s_min < 16:
-            score_A = 29
-        elif 16 <= duration_s_min < 20:
-            score_A = 37
-        elif 20 <= duration_s_min < 30:
-            score_A = 53
-        elif 30 <= duration_s_min < 40:
-            score_A = 68
-        elif 40 <= duration_s_min < 50:
-            score_A = 91
-        else:
-            score_A = 113
-        return score_A
-
-    # Score A calculations for each posture type
-    def calculate_score_A_type_16(self, duration_s_min):
-        if duration_s_min < 3:
-            score_A = 0
-        elif 3 <= duration_s_min < 4.5:
-            score_A = 6.7
-        elif 4.5 <= duration_s_min < 6:
-            score_A = 10
-        elif 6 <= duration_s_min < 9:
-            score_A = 22
-        elif 9 <= duration_s_min < 12:
-            score_A = 33
-        elif 12 <= duration_s_min < 16:
-            score_A = 50
-        else:
-            score_A = 66
-        return score_A
+    def calculate_score_A_array(self, posture_types, durations_s_min):
+        # Score A for arrays of posture types (0 for unknown postures) and durations_s_min at once
+        return SCORE_A_POINTS_ARRAY[posture_types, np.searchsorted(SCORE_A_DURATIONS, durations_s_min, side="right")]
 
 
     def calculate_forces(self):
         # Placeholder for calculating forces score
         pass
 
-    def calculate_loads(self, loads, index=None):
+    def calculate_loads(self, loads=None, index=None):
         self.loads_score = 0
+        if loads is None:
+            loads = self.loads
         
         #Find end index of loads based on that of posture
-        loads = self.loads
         load_index = None
         if index is not None:
             end_time = self.postures[index-1]["timestamp"]
@@ -665,443 +352,74 @@ class EAWSScore:
                     break
             index_counter += 1
 
-            load_type = load["type"]
-            transport_type = load["transport"]
-            weight = load["weight"]
-            posture = load["posture"]
-            conditions = load["conditions"]     #no idea how to get this (user input i guess)
-            frequency = load["frequency"]
-            duration = load["duration"]
-            distance = load["distance"]
-            
-            #Initialize component scores
-            load_points = 0
-            posture_points = 0
-            condition_points = 0
-            duration_factor = 0
-            
-            if load_type == "repositioning":
-                #weight score
-                if self.operator_gender == "M":
-                    if 3 <= weight < 10:
-                        load_points = 1
-                    elif 10 <= weight < 15:
-                        load_points = 1.5
-                    elif 15 <= weight < 20:
-                        load_points = 2
-                    elif 20 <= weight < 25:
-                        load_points = 3
-                    elif 25 <= weight < 30:
-                        load_points = 4
-                    elif 30 <= weight < 35:
-                        load_points = 10
-                    elif 35 <= weight < 40:
-                        load_points = 17
-                    elif weight >= 40:
-                        load_points = 25
-                else:
-                    if 2 <= weight < 5:
-                        load_points = 1
-                    elif 5 <= weight < 7:
-                        load_points = 1.5
-                    elif 7 <= weight < 10:
-                        load_points = 2
-                    elif 10 <= weight < 12:
-                        load_points = 3
-                    elif 12 <= weight < 15:
-                        load_points = 4
-                    elif 15 <= weight < 20:
-                        load_points = 5.5
-                    elif 20 <= weight < 25:
-                        load_points = 7
-                    elif weight >= 25:
-                        load_points = 25
-                
-                #posture score assumed to be equal to load["posture"]
-                posture_points = posture
-                #condition score assumed to be equal to load["conditions"]
-                condition_points = conditions
-                
-                #frequency/duration/distance factor
-                if 5 <= frequency < 25:
-                    duration_factor = 1
-                elif 25 <= frequency < 120:
-                    duration_factor = 2
-                elif 120 <= frequency < 350:
-                    duration_factor = 4
-                elif 350 <= frequency < 750:
-                    duration_factor = 6
-                elif 750 <= frequency < 1000:
-                    duration_factor = 8
-                elif 1000 <= frequency < 1500:
-                    duration_factor = 10
-                elif 1500 <= frequency < 2000:
-                    duration_factor = 11
-                elif 2000 <= frequency < 2500:
-                    duration_factor = 13
-                elif 2500 <= frequency < 3000:
-                    duration_factor = 14
-                elif frequency >= 3000:
-                    duration_factor = 15
-
-            elif load_type == "carrying":
-                #weight score
-                if self.operator_gender == "M":
-                    if 3 <= weight < 10:
-                        load_points = 1
-                    elif 10 <= weight < 15:
-                        load_points = 1.5
-                    elif 15 <= weight < 20:
-                        load_points = 2
-                    elif 20 <= weight < 25:
-                        load_points = 3
-                    elif 25 <= weight < 30:
-                        load_points = 4
-                    elif 30 <= weight < 35:
-                        load_points = 10
-                    elif 35 <= weight < 40:
-                        load_points = 17
-                    elif weight >= 40:
-                        load_points = 25
-                else:
-                    if 2 <= weight < 5:
-                        load_points = 1
-                    elif 5 <= weight < 7:
-                        load_points = 1.5
-                    elif 7 <= weight < 10:
-                        load_points = 2
-                    elif 10 <= weight < 12:
-                        load_points = 3
-                    elif 12 <= weight < 15:
-                        load_points = 4
-                    elif 15 <= weight < 20:
-                        load_points = 5.5
-                    elif 20 <= weight < 25:
-                        load_points = 7
-                    elif weight >= 25:
-                        load_points = 25
-                
-                #posture score assumed to be given by load["posture"]
-                posture_points = posture
-                #condition score assumed to be given by load["conditions"]
-                condition_points = conditions
-                
-                #frequency/duration/distance factor
-                if 300 <= distance < 650:
-                    duration_factor = 1
-                elif 650 <= distance < 2500:
-                    duration_factor = 2
-                elif 2500 <= distance < 6000:
-                    duration_factor = 4
-                elif 6000 <= distance < 12000:
-                    duration_factor = 6
-                elif 12000 <= distance < 16000:
-                    duration_factor = 8
-                elif distance >= 16000:
-                    duration_factor = 10
-                    
-            elif load_type == "holding":
-                #weight score
-                if self.operator_gender == "M":
-                    if 3 <= weight < 10:
-                        load_points = 1
-                    elif 10 <= weight < 15:
-                        load_points = 1.5
-                    elif 15 <= weight < 20:
-                        load_points = 2
-                    elif 20 <= weight < 25:
-                        load_points = 3
-                    elif 25 <= weight < 30:
-                        load_points = 4
-                    elif 30 <= weight < 35:
-                        load_points = 10
-                    elif 35 <= weight < 40:
-                        load_points = 17
-                    elif weight >= 40:
-                        load_points = 25
-                else:
-                    if 2 <= weight < 5:
-                        load_points = 1
-                    elif 5 <= weight < 7:
-                        load_points = 1.5
-                    elif 7 <= weight < 10:
-                        load_points = 2
-                    elif 10 <= weight < 12:
-                        load_points = 3
-                    elif 12 <= weight < 15:
-                        load_points = 4
-                    elif 15 <= weight < 20:
-                        load_points = 5.5
-                    elif 20 <= weight < 25:
-                        load_points = 7
-                    elif weight >= 25:
-                        load_points = 25
-                
-                #posture score assumed to be given by load["posture"]
-                posture_points = posture
-                #condition score assumed to be given by load["conditions"]
-                condition_points = conditions
-                
-                #frequency/duration/distance factor
-                if 2.5 <= duration < 10:
-                    duration_factor = 1
-                elif 10 <= duration < 37:
-                    duration_factor = 2
-                elif 37 <= duration < 90:
-                    duration_factor = 4
-                elif 90 <= duration < 180:
-                    duration_factor = 6
-                elif 180 <= duration < 240:
-                    duration_factor = 8
-                elif duration >= 240:
-                    duration_factor = 10
-                    
-            elif load_type == "push_pull_short":
-                #weight score
-                if self.operator_gender == "M":
-                    if transport_type == "wheelbarrow":
-                        if 50 <= weight < 75:
-                            load_points = 0.5
-                        elif 75 <= weight < 100:
-                            load_points = 1
-                        elif 100 <= weight < 150:
-                            load_points = 1.5
-                        elif 150 <= weight < 200:
-                            load_points = 2
-                        elif 200 <= weight < 250:
-                            load_points = 3
-                        elif weight >= 250:
-                            load_points = 4
-                    elif transport_type == "carriage":
-                        if 50 <= weight < 75:
-                            load_points = 0.5
-                        elif 75 <= weight < 100:
-                            load_points = 1
-                        elif 100 <= weight < 150:
-                            load_points = 1.5
-                        elif 150 <= weight < 250:
-                            load_points = 2
-                        elif 250 <= weight < 350:
-                            load_points = 3
-                        elif 350 <= weight < 550:
-                            load_points = 4
-                        elif weight >= 550:
-                            load_points = 5
-                    elif transport_type == "cart":
-                        if 50 <= weight < 75:
-                            load_points = 0.5
-                        elif 75 <= weight < 150:
-                            load_points = 1
-                        elif 150 <= weight < 250:
-                            load_points = 1.5
-                        elif 250 <= weight < 350:
-                            load_points = 2
-                        elif 350 <= weight < 500:
-                            load_points = 3
-                        elif 500 <= weight < 600:
-                            load_points = 4
-                        elif 600 <= weight < 800:
-                            load_points = 5
-                        elif 800 <= weight < 1250:
-                            load_points = 6
-                        elif weight >= 1250:
-                            load_points = 8
-                else:
-                    if transport_type == "wheelbarrow":
-                        if 40 <= weight < 60:
-                            load_points = 0.5
-                        elif 60 <= weight < 80:
-                            load_points = 1
-                        elif 80 <= weight < 115:
-                            load_points = 1.5
-                        elif 115 <= weight < 155:
-                            load_points = 2
-                        elif 155 <= weight < 195:
-                            load_points = 3
-                        elif weight >= 195:
-                            load_points = 4
-                    elif transport_type == "carriage":
-                        if 40 <= weight < 60:
-                            load_points = 0.5
-                        elif 60 <= weight < 80:
-                            load_points = 1
-                        elif 80 <= weight < 115:
-                            load_points = 1.5
-                        elif 115 <= weight < 195:
-                            load_points = 2
-                        elif 195 <= weight < 270:
-                            load_points = 3
-                        elif 270 <= weight < 425:
-                            load_points = 4
-                        elif weight >= 425:
-                            load_points = 5
-                    elif transport_type == "cart":
-                        if 40 <= weight < 60:
-                            load_points = 0.5
-                        elif 60 <= weight < 115:
-                            load_points = 1
-                        elif 115 <= weight < 195:
-                            load_points = 1.5
-                        elif 195 <= weight < 270:
-                            load_points = 2
-                        elif 270 <= weight < 385:
-                            load_points = 3
-                        elif 385 <= weight < 460:
-                            load_points = 4
-                        elif 460 <= weight < 615:
-                            load_points = 5
-                        elif 615 <= weight < 960:
-                            load_points = 6
-                        elif weight >= 960:
-                            load_points = 8
-                
-                #posture score assumed to be equal to load["posture"]
-                posture_points = posture
-                #condition score assumed to be equal to load["conditions"]
-                condition_points = conditions
-                
-                #frequency/duration/distance factor
-                if 5 <= frequency < 25:
-                    duration_factor = 1
-                elif 25 <= frequency < 120:
-                    duration_factor = 2
-                elif 120 <= frequency < 350:
-                    duration_factor = 4
-                elif 350 <= frequency < 750:
-                    duration_factor = 6
-                elif 750 <= frequency < 1000:
-                    duration_factor = 8
-                elif 1000 <= frequency < 1500:
-                    duration_factor = 10
-                elif 1500 <= frequency < 2000:
-                    duration_factor = 11
-                elif 2000 <= frequency < 2500:
-                    duration_factor = 13
-                elif 2500 <= frequency < 3000:
-                    duration_factor = 14
-                elif frequency >= 3000:
-                    duration_factor = 15
-                    
-            elif load_type == "push_pull_long":
-                #weight score
-                if self.operator_gender == "M":
-                    if transport_type == "wheelbarrow":
-                        if 50 <= weight < 75:
-                            load_points = 0.5
-                        elif 75 <= weight < 100:
-                            load_points = 1
-                        elif 100 <= weight < 150:
-                            load_points = 1.5
-                        elif 150 <= weight < 200:
-                            load_points = 2
-                        elif 200 <= weight < 250:
-                            load_points = 3
-                        elif weight >= 250:
-                            load_points = 4
-                    elif transport_type == "carriage":
-                        if 50 <= weight < 75:
-                            load_points = 0.5
-                        elif 75 <= weight < 100:
-                            load_points = 1
-                        elif 100 <= weight < 150:
-                            load_points = 1.5
-                        elif 150 <= weight < 250:
-                            load_points = 2
-                        elif 250 <= weight < 350:
-                            load_points = 3
-                        elif 350 <= weight < 550:
-                            load_points = 4
-                        elif weight >= 550:
-                            load_points = 5
-                    elif transport_type == "cart":
-                        if 50 <= weight < 75:
-                            load_points = 0.5
-                        elif 75 <= weight < 150:
-                            load_points = 1
-                        elif 150 <= weight < 250:
-                            load_points = 1.5
-                        elif 250 <= weight < 350:
-                            load_points = 2
-                        elif 350 <= weight < 500:
-                            load_points = 3
-                        elif 500 <= weight < 600:
-                            load_points = 4
-                        elif 600 <= weight < 800:
-                            load_points = 5
-                        elif 800 <= weight < 1250:
-                            load_points = 6
-                        elif weight >= 1250:
-                            load_points = 8
-                else:
-                    if transport_type == "wheelbarrow":
-                        if 40 <= weight < 60:
-                            load_points = 0.5
-                        elif 60 <= weight < 80:
-                            load_points = 1
-                        elif 80 <= weight < 115:
-                            load_points = 1.5
-                        elif 115 <= weight < 155:
-                            load_points = 2
-                        elif 155 <= weight < 195:
-                            load_points = 3
-                        elif weight >= 195:
-                            load_points = 4
-                    elif transport_type == "carriage":
-                        if 40 <= weight < 60:
-                            load_points = 0.5
-                        elif 60 <= weight < 80:
-                            load_points = 1
-                        elif 80 <= weight < 115:
-                            load_points = 1.5
-                        elif 115 <= weight < 195:
-                            load_points = 2
-                        elif 195 <= weight < 270:
-                            load_points = 3
-                        elif 270 <= weight < 425:
-                            load_points = 4
-                        elif weight >= 425:
-                            load_points = 5
-                    elif transport_type == "cart":
-                        if 40 <= weight < 60:
-                            load_points = 0.5
-                        elif 60 <= weight < 115:
-                            load_points = 1
-                        elif 115 <= weight < 195:
-                            load_points = 1.5
-                        elif 195 <= weight < 270:
-                            load_points = 2
-                        elif 270 <= weight < 385:
-                            load_points = 3
-                        elif 385 <= weight < 460:
-                            load_points = 4
-                        elif 460 <= weight < 615:
-                            load_points = 5
-                        elif 615 <= weight < 960:
-                            load_points = 6
-                        elif weight >= 960:
-                            load_points = 8
-            
-                #posture score assumed to be given by load["posture"]
-                posture_points = posture
-                #condition score assumed to be given by load["conditions"]
-                condition_points = conditions
-                
-                #frequency/duration/distance factor
-                if 300 <= distance < 650:
-                    duration_factor = 1
-                elif 650 <= distance < 2500:
-                    duration_factor = 2
-                elif 2500 <= distance < 6000:
-                    duration_factor = 4
-                elif 6000 <= distance < 12000:
-                    duration_factor = 6
-                elif 12000 <= distance < 16000:
-                    duration_factor = 8
-                elif distance >= 16000:
-                    duration_factor = 10
-            
-            if (self.operator_gender == "M" and weight >= 3) or (self.operator_gender == "F" and weight >= 2):     #weights less than 3 kg (or 2 kg for female) are not considered in the EAWS
-                self.loads_score += (load_points + posture_points + condition_points)*duration_factor
+            self.loads_score += self.calculate_load_score(load)
+
+    def calculate_load_score(self, load):
+        load_type = load["type"]
+        weight = load["weight"]
+        
+        if load_type not in LOAD_TYPES:
+            return 0
+        points_table, duration_column = LOAD_TYPES[load_type]
+        if points_table == "push_pull":
+            points_table = load["transport"]
+
+        #weight score
+        weights, points = LOAD_POINTS["M" if self.operator_gender == "M" else "F"].get(points_table, ([], [0]))
+        load_points = points[bisect.bisect_right(weights, weight)]
+        #posture score assumed to be equal to load["posture"]
+        posture_points = load["posture"]
+        #condition score assumed to be equal to load["conditions"]
+        condition_points = load["conditions"]     #no idea how to get this (user input i guess)
+        #frequency/duration/distance factor
+        limits, factors = DURATION_FACTORS[duration_column]
+        duration_factor = factors[bisect.bisect_right(limits, load[duration_column])]
+        
+        if (self.operator_gender == "M" and weight >= 3) or (self.operator_gender == "F" and weight >= 2):     #weights less than 3 kg (or 2 kg for female) are not considered in the EAWS
+            return (load_points + posture_points + condition_points)*duration_factor
+        return 0
+
+    def calculate_load_scores(self, loads, load_score_terms=None):
+        # Load handling score of every load event of the load table at once, and the cumulative score after each event.
+        # Gives the same values as calculate_load_score for each event and adding them up in order.
+        # load_score_terms can be given when find_load_score_terms was already called for the load table.
+        if load_score_terms is None:
+            load_score_terms = self.find_load_score_terms(loads)
+        load_points, duration_factors, considered = load_score_terms
+        load_scores = np.where(considered, (load_points + loads.posture + loads.conditions)*duration_factors, 0)
+
+        #scores stay ints as long as only whole load points are added
+        float_scores = considered & (load_points != np.floor(load_points))
+        cumulative_loads_score = np.cumsum(load_scores)
+        float_cumulative = np.logical_or.accumulate(float_scores)
+        return ([score if is_float else int(score) for score, is_float in zip(load_scores.tolist(), float_scores.tolist())],
+                [score if is_float else int(score) for score, is_float in zip(cumulative_loads_score.tolist(), float_cumulative.tolist())])
+
+    def find_load_score_terms(self, loads):
+        # Load points, duration factor and whether the weight is considered for every load event of the load table
+        load_points = np.zeros(len(loads))
+        duration_factors = np.zeros(len(loads))
+        for load_type, (points_table, duration_column) in LOAD_TYPES.items():
+            is_type = loads.type == load_type
+            if not is_type.any():
+                continue
+            if points_table == "push_pull":
+                selections = [(transport, is_type & (loads.transport == transport)) for transport in ["wheelbarrow", "carriage", "cart"]]
+            else:
+                selections = [(points_table, is_type)]
+            for points_table, selected in selections:
+                weights, points = LOAD_POINTS["M" if self.operator_gender == "M" else "F"][points_table]
+                load_points[selected] = np.array(points, dtype=float)[np.searchsorted(weights, loads.weight[selected], side="right")]
+            limits, factors = DURATION_FACTORS[duration_column]
+            duration_factors[is_type] = np.array(factors, dtype=float)[np.searchsorted(limits, getattr(loads, duration_column)[is_type], side="right")]
+
+        if self.operator_gender == "M":
+            considered = loads.weight >= 3
+        elif self.operator_gender == "F":
+            considered = loads.weight >= 2
+        else:
+            considered = np.zeros(len(loads), dtype=bool)
+        return load_points, duration_factors, considered
 
 
     def calculate_upper_limbs(self):
@@ -1120,4 +438,124 @@ class EAWSScore:
             # Calculate the EAWS score as the sum of posture score and other sub-scores
             eaws_score = self.whole_body_extra_points + self.postures_score + self.forces_score + self.loads_score + self.upper_limbs_score
             
-            return self.whole_body_extra_points, self.postures_score, self.loads_score, eaws_score
\ No newline at end of file
+            return self.whole_body_extra_points, self.postures_score, self.loads_score, eaws_score
+
+    def calculate_partial_score(self, accumulated_times=None):
+        #partial aggregate of this recording, to be merged with those of the other recordings of a shift (see EAWSPartialScore)
+        #accumulated_times can be given when the postures were already accumulated together with the KIM durations (see ScoreTimeline)
+        if accumulated_times is None:
+            accumulated_times = self.accumulate_posture_times()
+        load_score_terms = self.find_load_score_terms(self.loads)
+        loads_score = 0
+        for load_score in self.calculate_load_scores(self.loads, load_score_terms)[0]:
+            loads_score += load_score
+        load_points, duration_factors, considered = load_score_terms
+        conditions_factor = float(np.sum(duration_factors[considered]))
+        return EAWSPartialScore(self.total_duration, accumulated_times, loads_score, conditions_factor)
+
+    def calculate_merged_score(self, partial_score):
+        #posture and load scores of the merged partial aggregates, as if they were one recording of their total duration
+        self.total_duration = partial_score.duration
+        self.postures_score = self.calculate_accumulated_posture_score(partial_score.accumulated_times, self.total_duration)
+        self.loads_score = partial_score.loads_score
+        return self.calculate_eaws_score()
+
+    def calculate_scenario_scores(self, partial_score, extra_loads, extra_conditions=0):
+        # EAWS score of the merged partial aggregates for a batch of scenarios at once, see calculate_whole_body_extra_points_array.
+        # extra_conditions are condition points added to every load event (one value per scenario or a single value).
+        self.total_duration = partial_score.duration
+        postures_score = self.calculate_accumulated_posture_score(partial_score.accumulated_times, self.total_duration)
+        whole_body_extra_points = self.calculate_whole_body_extra_points_array(extra_loads)
+        loads_score = partial_score.loads_score + np.asarray(extra_conditions, dtype=float)*partial_score.conditions_factor
+        return whole_body_extra_points + postures_score + self.forces_score + loads_score + self.upper_limbs_score
+
+    def calculate_posture_score_timeline(self, scored):
+        # Posture score at every posture index, from the accumulated times of the first index+1 scored postures and the timestamp of the index as duration.
+        # Each posture group is looked up for all indices at once, adding up the points in the same order as calculate_accumulated_posture_score.
+        durations = self.postures.timestamp
+        scored_codes = self.postures.code[scored]
+        scored_times = self.postures.time[scored]
+        if not len(scored_codes):
+            return [0]*len(durations)
+        last_scored = np.minimum(np.arange(len(durations)), len(scored_codes)-1)
+
+        #distinct postures in the order they are first scored
+        codes, first_scored = np.unique(scored_codes, return_index=True)
+        codes = codes[np.argsort(first_scored)].tolist()
+        posture_groups = self.postures.lookup("EAWS posture groups", self.find_posture_groups)
+
+        score_A = np.zeros(len(durations))
+        score_B = np.zeros(len(durations))
+        float_points = np.zeros(len(durations), dtype=bool)     #the score stays an int as long as only whole points are added
+        for group in range(4):      #prefix, FRX group, TRX group, LBX group
+            group_codes = {}
+            for code in codes:
+                group_codes.setdefault(posture_groups[code][group], []).append(code)
+
+            for key, key_codes in group_codes.items():
+                times = np.where(np.isin(scored_codes, key_codes), scored_times, 0)
+                if group == 2:
+                    accumulated_times = np.cumsum(np.repeat(times, 2))[1::2]     #TRX groups are accumulated twice
+                else:
+                    accumulated_times = np.cumsum(times)
+                durations_s_min = accumulated_times[last_scored] * 60 / durations
+
+                if group == 0:
+                    points = self.calculate_score_A_array(np.full(len(durations), self.find_posture_type(key) or 0), durations_s_min)
+                    score_A += points
+                else:
+                    if group == 1:
+                        points = self.far_reach_duration_array(durations_s_min)
+                    else:
+                        points = self.assym_duration_array(durations_s_min)
+                    score_B += int(key[-1])*points
+                float_points |= points != np.floor(points)
+
+        postures_scores = score_A + score_B
+        return [score if is_float else int(score) for score, is_float in zip(postures_scores.tolist(), float_points.tolist())]
+
+    def calculate_eaws_timeline(self):
+        # Calculate the intermediate EAWS score at every posture index in a single pass over the posture and load arrays.
+        # Gives the same values as calling calculate_loads(loads, index) and calculate_intermediate_eaws_score(timestamp, index) for each index.
+        timeline = []
+        if not len(self.postures):
+            return timeline
+
+        #cumulative load score after each load event
+        load_scores, cumulative_loads_score = self.calculate_load_scores(self.loads)
+
+        scored = ~self.get_load_intervals().heavy_load_postures     #posture score is not considered for loads greater than 3 kg (use handled loads instead)
+        postures_scores = self.calculate_posture_score_timeline(scored)
+
+        #load events up to and including the first load event at or after the previous posture (index 0 wraps around to the last posture)
+        end_load_indices = np.searchsorted(self.loads.time, np.roll(self.postures.timestamp, 1), side="left").tolist()
+
+        for index, postures_score in enumerate(postures_scores):
+            if end_load_indices[index] < len(self.loads):
+                loads_score = cumulative_loads_score[end_load_indices[index]]
+            elif len(self.loads):
+                loads_score = cumulative_loads_score[-1]
+            else:
+                loads_score = 0
+
+            eaws_score = self.whole_body_extra_points + postures_score + self.forces_score + loads_score + self.upper_limbs_score
+            timeline.append((self.whole_body_extra_points, postures_score, loads_score, eaws_score))
+
+        return timeline
+
+class EAWSPartialScore:
+    #sums over the postures and load events of one part of a shift (a recording or a time chunk of one), which can be merged in any grouping
+    def __init__(self, duration, accumulated_times, loads_score, conditions_factor):
+        self.duration = duration                        # seconds
+        self.accumulated_times = accumulated_times      # accumulated times of the prefixes, FRX groups, TRX groups and LBX groups
+        self.loads_score = loads_score                  # sum of the load handling scores
+        self.conditions_factor = conditions_factor      # increase of the load handling score per condition point added to every load event
+
+    def merge(self, other):
+        accumulated_times = []
+        for times, other_times in zip(self.accumulated_times, other.accumulated_times):
+            times = dict(times)
+            for group, time in other_times.items():
+                times[group] = times.get(group, 0) + time
+            accumulated_times.append(times)
+        return EAWSPartialScore(self.duration + other.duration, accumulated_times, self.loads_score + other.loads_score, self.conditions_factor + other.conditions_factor)
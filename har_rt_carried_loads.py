@@ -11,8 +11,8 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from collections import deque
-from pylsl import StreamInlet, StreamOutlet, StreamInfo, resolve_stream
-from scipy.signal import butter, lfilter, freqz
+from pylsl import StreamInlet, StreamOutlet, StreamInfo, resolve_stream, local_clock, proc_clocksync
+from scipy.signal import butter, freqz, sosfilt
 from participant import Operator
 
 import warnings
@@ -45,7 +45,23 @@ EAWS_TrunkRotation = "TR"
 EAWS_LateralBending = "LB"
 
 
-def auto_label(df):
+def auto_label(df, codes=False):
+    #posture labels (AutoDePos) of each row, or only their codes (Base_Code, Sym_Code, Fr_Code, Tr_Code, Lb_Code) if codes is True
+    base_code, sym_code, fr_code, tr_code, lb_code = find_posture_codes(df)
+
+    df["Base_Code"] = base_code
+    df["Sym_Code"] = sym_code
+    df["Fr_Code"] = fr_code
+    df["Tr_Code"] = tr_code
+    df["Lb_Code"] = lb_code
+    if not codes:
+        df["AutoDePos"] = format_labels(base_code, sym_code, fr_code, tr_code, lb_code)
+        df.drop(columns=["Base_Code", "Sym_Code", "Fr_Code", "Tr_Code", "Lb_Code"], inplace=True)
+
+    return df
+
+def find_posture_codes(samples):
+    #posture codes (base, sym, fr, tr, lb) of each sample, samples maps the column names to arrays (a dataframe or a dict of the live window means)
     # Constants
     MULT_PELVIS_Z_LY = 0.2
     MULT_PELVIS_Z_CR = 0.85
@@ -61,16 +77,13 @@ def auto_label(df):
 
     st_u_L5_avg = 1.0 #df[position_Pelvis_z][:8].mean(skipna=True) --> TO CHECK
 
-    # Main poses: St, Ly, Cr
-    df["AutoDePos"] = "St"  # Default value
-    # Use vectorized updates for main poses
-    df["AutoDePos"] = np.where(df[position_Pelvis_z] < MULT_PELVIS_Z_LY * st_u_L5_avg, "Ly", "St")
-    df["AutoDePos"] = np.where(
-        (df[position_Pelvis_z] >= MULT_PELVIS_Z_LY * st_u_L5_avg) & (df[position_Pelvis_z] < MULT_PELVIS_Z_CR * st_u_L5_avg), "Cr", df["AutoDePos"]
-    )
-    df["AutoDePos"] = np.where(
-        (df["AutoDePos"] == "Ly") & (df[Vertical_T8_z] < TH_PELVIS_BF), "Cr", df["AutoDePos"]
+    # Main poses: St, Cr, Ly (codes 0, 1, 2)
+    pelvis_z = np.asarray(samples[position_Pelvis_z], dtype=float)
+    trunk_bending = np.asarray(samples[Vertical_T8_z], dtype=float)
+    base_code = np.select(
+        [pelvis_z < MULT_PELVIS_Z_LY * st_u_L5_avg, pelvis_z < MULT_PELVIS_Z_CR * st_u_L5_avg], [2, 1], default=0
     )
+    base_code = np.where((base_code == 2) & (trunk_bending < TH_PELVIS_BF), 1, base_code)
 
     #print(st_u_L5_avg)
     # print(df[position_Pelvis_z], " ", MULT_PELVIS_Z_LY * st_u_L5_avg, " : ", MULT_PELVIS_Z_CR * st_u_L5_avg)
@@ -81,136 +94,197 @@ def auto_label(df):
     #    "AutoDePos",
     #] = "Cr"
 
-    """(
-            (df[jLeftShoulder_y] >= TH_SHOULDER_OH + OFFSET_SHOULDER_BF_Y)
-            | (df[jLeftShoulder_z] >= TH_SHOULDER_OH + OFFSET_SHOULDER_BF_Z)
-            | (df[jRightShoulder_y] >= TH_SHOULDER_OH + OFFSET_SHOULDER_BF_Y)
-            | (df[jRightShoulder_z] >= TH_SHOULDER_OH + OFFSET_SHOULDER_BF_Z)
-        ),
-        (
-            (df[jLeftShoulder_y] >= TH_SHOULDER_OS + OFFSET_SHOULDER_BF_Y)
-            | (df[jLeftShoulder_z] >= TH_SHOULDER_OS + OFFSET_SHOULDER_BF_Z)
-            | (df[jRightShoulder_y] >= TH_SHOULDER_OS + OFFSET_SHOULDER_BF_Y)
-            | (df[jRightShoulder_z] >= TH_SHOULDER_OS + OFFSET_SHOULDER_BF_Z)
-        ),"""
-    
-    # Symmetric sub-poses: : BF, BS, OH, OS, U
+    # Symmetric sub-poses: BS, BF, OH, OS, U (codes 1 to 5 in order of precedence, 0 for none)
+    left_shoulder = np.asarray(samples[jLeftShoulder_z], dtype=float)
+    right_shoulder = np.asarray(samples[jRightShoulder_z], dtype=float)
+    standing = base_code == 0
+    crouching = base_code == 1
     conditions_sym = [
-        (((df[Vertical_T8_z] >= TH_PELVIS_BS ) | (df[Vertical_T8_z] <= TH_PELVIS_BS_NEG)) & (df["AutoDePos"] == "St")),
-        (((df[Vertical_T8_z] >= TH_PELVIS_BS + OFFSET_CR) | (df[Vertical_T8_z] <= TH_PELVIS_BS_NEG + OFFSET_CR)) & (df["AutoDePos"] == "Cr")),
-        ((df[Vertical_T8_z] >= TH_PELVIS_BF) & (df["AutoDePos"] == "St")),
-        ((df[Vertical_T8_z] >= TH_PELVIS_BF + OFFSET_CR) & (df["AutoDePos"] == "Cr")),
-        (
-            (df[jLeftShoulder_z] >= TH_SHOULDER_OH + OFFSET_SHOULDER_BF_Z)
-            | (df[jRightShoulder_z] >= TH_SHOULDER_OH + OFFSET_SHOULDER_BF_Z)
-        ),
-        (
-            (df[jLeftShoulder_z] >= TH_SHOULDER_OS + OFFSET_SHOULDER_BF_Z)
-            | (df[jRightShoulder_z] >= TH_SHOULDER_OS + OFFSET_SHOULDER_BF_Z)
-        ),
-        ((df[Vertical_T8_z] < TH_PELVIS_BF) & (df["AutoDePos"] != "Cr")),
-        ((df[Vertical_T8_z] < TH_PELVIS_BF + OFFSET_CR) & (df["AutoDePos"] == "Cr")),
+        (((trunk_bending >= TH_PELVIS_BS) | (trunk_bending <= TH_PELVIS_BS_NEG)) & standing)
+        | (((trunk_bending >= TH_PELVIS_BS + OFFSET_CR) | (trunk_bending <= TH_PELVIS_BS_NEG + OFFSET_CR)) & crouching),
+        ((trunk_bending >= TH_PELVIS_BF) & standing) | ((trunk_bending >= TH_PELVIS_BF + OFFSET_CR) & crouching),
+        (left_shoulder >= TH_SHOULDER_OH + OFFSET_SHOULDER_BF_Z) | (right_shoulder >= TH_SHOULDER_OH + OFFSET_SHOULDER_BF_Z),
+        (left_shoulder >= TH_SHOULDER_OS + OFFSET_SHOULDER_BF_Z) | (right_shoulder >= TH_SHOULDER_OS + OFFSET_SHOULDER_BF_Z),
+        ((trunk_bending < TH_PELVIS_BF) & ~crouching) | ((trunk_bending < TH_PELVIS_BF + OFFSET_CR) & crouching),
     ]
-    choices_sym = ["_BS", "_BS", "_BF", "_BF", "_OH", "_OS", "_U", "_U"]
-
-    # Define precedence for choices_sym
-    precedence_order = {"_BS": 1, "_BF": 2, "_OH": 3, "_OS": 4, "_U": 5}
-
-    # Initialize a column to store the choice with the highest precedence
-    df["Sym_Label"] = ""
-
-    for condition, choice in zip(conditions_sym, choices_sym):
-        # Replace with precedence order and fill missing values
-        precedence_values = df["Sym_Label"].map(precedence_order).fillna(float("inf"))
-
-        # Only update if the current condition is met and the new choice has higher precedence
-        df["Sym_Label"] = np.where(
-            condition & (precedence_values > precedence_order.get(choice, float("inf"))),
-            choice,
-            df["Sym_Label"]
-        )
-
-    # Append the highest-priority label to `AutoDePos`
-    df["AutoDePos"] = np.where(
-        df["Sym_Label"] != "",
-        df["AutoDePos"].str.replace("|".join(precedence_order.keys()), "") + df["Sym_Label"],
-        df["AutoDePos"]
-    )
-
-    # Drop intermediate column
-    df.drop(columns=["Sym_Label"], inplace=True)
+    sym_code = np.select(conditions_sym, [1, 2, 3, 4, 5], default=0)
 
     label_fr = True
     if label_fr:
-        # Asymmetric sub-poses: Far reach
+        # Asymmetric sub-poses: Far reach, FR5 below 5 degrees elbow flexion up to FR0 below 180 degrees, with the shoulder raised
         thresholds_fr = np.array([5, 20, 35, 50, 70, 180])
-        choices_fr = ["_FR5", "_FR4", "_FR3", "_FR2", "_FR1", "_FR0"]
-
-        # Use np.select to apply conditions in one step
-        df["Fr_Labels"] = np.select(
-            [((df[jLeftElbow_z] < t) & (df[jLeftShoulder_z] >= TH_SHOULDER_FR)) | ((df[jRightElbow_z] < t) & (df[jRightShoulder_z] >= TH_SHOULDER_FR)) for t in thresholds_fr], choices_fr, default="_FR0"
-        )
-
-        # Avoid overwriting existing labels in `AutoDePos` if already contains a far reach label
-        df["AutoDePos"] = np.where(
-            df["AutoDePos"].str.contains("|".join(choices_fr)),
-            df["AutoDePos"],
-            df["AutoDePos"] + df["Fr_Labels"],
-        )
-
-        # Drop intermediate column used for labeling
-        df.drop(columns=["Fr_Labels"], inplace=True)
+        fr_codes = []
+        for elbow, shoulder in [(jLeftElbow_z, jLeftShoulder_z), (jRightElbow_z, jRightShoulder_z)]:
+            fr_code = 5 - np.digitize(np.asarray(samples[elbow], dtype=float), thresholds_fr)
+            fr_codes.append(np.where(np.asarray(samples[shoulder], dtype=float) >= TH_SHOULDER_FR, fr_code, -1))
+        fr_code = np.maximum(np.maximum(fr_codes[0], fr_codes[1]), 0)
     else:
         #set all labels to FR0
-        df["Fr_Labels"] = np.select(
-            abs(df[jLeftShoulder_y]) >= 0, ["_FR0"], default=""
-        )
-
-        df["AutoDePos"] = df["AutoDePos"] + df["Fr_Labels"]
-
-        # Drop intermediate column used for labeling
-        df.drop(columns=["Fr_Labels"], inplace=True)
-
-    # Asymmetric sub-poses: Trunk rotations
-    thresholds_tr = np.array([30, 25, 20, 15, 10, 0])
-    choices_tr = ["_TR5", "_TR4", "_TR3", "_TR2", "_TR1", "_TR0"]
-
-    # Use np.select to apply conditions in one step
-    df["Tr_Labels"] = np.select(
-        [abs(df[jRight_Hip_y]) > t for t in thresholds_tr], choices_tr, default=""
-    )
-
-    # Avoid overwriting existing labels in `AutoDePos` if already contains a trunk label
-    df["AutoDePos"] = np.where(
-        df["AutoDePos"].str.contains("|".join(choices_tr)),
-        df["AutoDePos"],
-        df["AutoDePos"] + df["Tr_Labels"],
-    )
-
-    # Drop intermediate column used for labeling
-    df.drop(columns=["Tr_Labels"], inplace=True)
-
-    # Asymmetric sub-poses: Trunk lateral bendings
-    # Calculate thresholds for trunk lateral bending
-    thresholds_lb = np.array([30, 25, 20, 15, 10, 0])
-    choices_lb = ["_LB5", "_LB4", "_LB3", "_LB2", "_LB1", "_LB0"]
-
-    # Use np.select to apply conditions in one step
-    df["Lb_Labels"] = np.select(
-        [abs(df[jRight_Hip_x]) > t for t in thresholds_lb], choices_lb, default=""
-    )
-
-    # Avoid overwriting existing labels in `AutoDePos` if already contains a lateral bending label
-    df["AutoDePos"] = np.where(
-        df["AutoDePos"].str.contains("|".join(choices_lb)),
-        df["AutoDePos"],
-        df["AutoDePos"] + df["Lb_Labels"],
-    )
-
-    # Drop intermediate column used for labeling
-    df.drop(columns=["Lb_Labels"], inplace=True)
-
-    return df
+        fr_code = np.where(abs(np.asarray(samples[jLeftShoulder_y], dtype=float)) >= 0, 0, -1)
+
+    # Asymmetric sub-poses: Trunk rotations and trunk lateral bendings, TR0/LB0 above 0 degrees up to TR5/LB5 above 30 degrees (-1 for none)
+    thresholds_asym = np.array([0, 10, 15, 20, 25, 30])
+    asym_codes = []
+    for column in [jRight_Hip_y, jRight_Hip_x]:
+        angle = np.abs(np.asarray(samples[column], dtype=float))
+        asym_codes.append(np.where(np.isnan(angle), -1, np.digitize(angle, thresholds_asym, right=True) - 1))
+    tr_code, lb_code = asym_codes
+
+    return base_code, sym_code, fr_code, tr_code, lb_code
+
+def format_labels(base_code, sym_code, fr_code, tr_code, lb_code):
+    #labels such as "St_BF_FR2_TR1_LB0" from the codes of auto_label, each distinct combination is formatted once
+    if not len(base_code):
+        return np.array([], dtype=object)
+    keys = (((np.asarray(base_code)*6 + sym_code)*7 + fr_code + 1)*7 + tr_code + 1)*7 + lb_code + 1     #fr, tr and lb codes are -1 to 5
+    combinations, inverse = np.unique(keys, return_inverse=True)
+    labels = []
+    for key in combinations.tolist():
+        key, lb = divmod(key, 7)
+        key, tr = divmod(key, 7)
+        base_sym, fr = divmod(key, 7)
+        base, sym = divmod(base_sym, 6)
+        fr, tr, lb = fr - 1, tr - 1, lb - 1
+        label = [EAWS_Standing, EAWS_Crouching, EAWS_Lying][base]
+        label += ["", "_" + EAWS_BentStrongForward, "_" + EAWS_BentForward, "_" + EAWS_HandsAboveHead, "_" + EAWS_ElbowOverShoulder, "_" + EAWS_Upright][sym]
+        label += "_" + EAWS_FarReach + str(fr) if fr >= 0 else ""
+        label += "_" + EAWS_TrunkRotation + str(tr) if tr >= 0 else ""
+        label += "_" + EAWS_LateralBending + str(lb) if lb >= 0 else ""
+        labels.append(label)
+    return np.array(labels, dtype=object)[inverse.reshape(-1)]
+
+def label_recording(df_raw, columns_list, chunk_size=20, window_size_s=0.25):
+    #labels the whole recording at once, with the same labels as labelling it chunk by chunk:
+    #one label per chunk of chunk_size rows, from the mean of the rows of the chunk within window_size_s of its last row
+    timestamps = df_raw["timestamp"].to_numpy().astype("datetime64[ns]").astype(np.int64)
+    values = df_raw[columns_list].to_numpy(dtype=float)
+    starts = np.arange(0, len(df_raw), chunk_size)
+    ends = np.minimum(starts + chunk_size, len(df_raw)) - 1
+
+    #rows of each chunk within the window (the last ones of the chunk, rows are in time order)
+    rows = np.minimum(starts[:, None] + np.arange(chunk_size), ends[:, None])
+    in_window = (np.abs(timestamps[rows] - timestamps[ends][:, None]) / 1e9 <= window_size_s) & (starts[:, None] + np.arange(chunk_size) <= ends[:, None])
+    window_lengths = in_window.sum(axis=1)
+
+    #mean of each column over the window, chunks with the same window length are averaged together
+    #(summing exactly the rows of the window, like the mean of the filtered chunk)
+    samples_mean = np.full((len(starts), len(columns_list)), np.nan)
+    for window_length in np.unique(window_lengths).tolist():
+        if not window_length:
+            continue
+        chunks = np.flatnonzero(window_lengths == window_length)
+        window_rows = ends[chunks][:, None] - np.arange(window_length - 1, -1, -1)
+        window_values = np.ascontiguousarray(values[window_rows].transpose(0, 2, 1))     #chunks x columns x rows
+        missing = np.isnan(window_values)
+        counts = window_length - missing.sum(axis=2)
+        sums = np.where(missing, 0, window_values).sum(axis=2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            samples_mean[chunks] = np.where(counts > 0, sums / counts, np.nan)
+
+    df_labelled = pd.DataFrame(samples_mean, columns=columns_list)
+    df_labelled["timestamp"] = df_raw["timestamp"].to_numpy()[ends]
+    df_labelled = auto_label(df_labelled)
+
+    timestamp_str = df_labelled["timestamp"].dt.strftime("%H:%M:%S.%f").str[:-3]  # Keep only milliseconds
+    return (timestamp_str + "," + df_labelled["AutoDePos"]).tolist()
+
+class LivePostureLabeller:
+    #labels the postures of the live Xsens ergonomic features stream (hum_ergo_feat) and publishes them on an AutoDePos stream,
+    #each new sample gets the label of the mean of the samples within window_size_s before it, like the offline labels
+    def __init__(self, columns_list, name="AutoDePos", window_size_s=0.25, max_latency_s=0.05):
+        self.columns_list = columns_list    # channels of the stream in the order of the recorded csv files
+        self.name = name
+        self.window_size_s = window_size_s
+        self.max_latency_s = max_latency_s
+        self.inlet = None
+        self.outlet = None
+
+        #samples of the last window, in time order
+        self.values = np.zeros((0, len(columns_list)))
+        self.timestamps = np.zeros(0)
+
+        #counters
+        self.sample_count = 0
+        self.label_count = 0
+        self.late_label_count = 0       # labels published more than max_latency_s after their sample
+        self.latency_sum = 0
+        self.latency_max = 0
+        self.start_time = None
+
+    def connect(self, stream_type="hum_ergo_feat"):
+        print(f"looking for a {stream_type} stream...")
+        streams = resolve_stream("type", stream_type)
+        self.inlet = StreamInlet(streams[0], max_buflen=1, processing_flags=proc_clocksync)     #timestamps in the local clock, for the latency
+        srate = self.inlet.info().nominal_srate()
+
+        info = StreamInfo(self.name, "AutoDePos", 1, srate, "string", self.inlet.info().source_id() + "_AutoDePos")
+        chns = info.desc().append_child("channels")
+        ch = chns.append_child("channel")
+        ch.append_child_value("label", "posture")
+        ch.append_child_value("unit", "/")
+        ch.append_child_value("type", "AutoDePos")
+        self.outlet = StreamOutlet(info)
+        self.start_time = local_clock()
+
+    def add_samples(self, samples, timestamps):
+        #labels of the new samples (rows x channels), computed from the window means of all the new samples at once
+        samples = np.asarray(samples, dtype=float)[:, :len(self.columns_list)]
+        timestamps = np.asarray(timestamps, dtype=float)
+        if not len(timestamps):
+            return np.array([], dtype=object)
+        values = np.concatenate([self.values, samples])
+        times = np.concatenate([self.timestamps, timestamps])
+
+        #sums and counts of the non-missing values of the window of each new sample, from cumulative sums
+        missing = np.isnan(values)
+        sums = np.concatenate([np.zeros((1, values.shape[1])), np.cumsum(np.where(missing, 0, values), axis=0)])
+        counts = np.concatenate([np.zeros((1, values.shape[1])), np.cumsum(~missing, axis=0)])
+        ends = np.arange(len(self.timestamps), len(times)) + 1
+        starts = np.searchsorted(times, times[ends-1] - self.window_size_s, side="left")
+        window_counts = counts[ends] - counts[starts]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(window_counts > 0, (sums[ends] - sums[starts]) / window_counts, np.nan)
+
+        #keep only the samples that can still be in the window of the next samples
+        first = np.searchsorted(times, times[-1] - self.window_size_s, side="left")
+        self.values = values[first:]
+        self.timestamps = times[first:]
+        self.sample_count += len(timestamps)
+
+        codes = find_posture_codes({column: means[:, i] for i, column in enumerate(self.columns_list)})
+        return format_labels(*codes)
+
+    def push_labels(self, labels, timestamps):
+        for label, timestamp in zip(labels.tolist(), timestamps):
+            self.outlet.push_sample([label], timestamp)     #same timestamp as the sample, so the labels can be aligned with the other streams
+        now = local_clock()
+        latencies = now - np.asarray(timestamps, dtype=float)
+        self.label_count += len(latencies)
+        self.late_label_count += int(np.count_nonzero(latencies > self.max_latency_s))
+        self.latency_sum += float(latencies.sum())
+        self.latency_max = max(self.latency_max, float(latencies.max()))
+
+    def get_statistics(self):
+        #latency (s) from the sample timestamp to the publication of its label and throughput (samples/s) since connect
+        elapsed = local_clock() - self.start_time if self.start_time is not None else 0
+        return {"samples": self.sample_count, "labels": self.label_count, "late labels": self.late_label_count,
+                "mean latency": self.latency_sum / self.label_count if self.label_count else 0, "max latency": self.latency_max,
+                "throughput": self.sample_count / elapsed if elapsed > 0 else 0}
+
+    def run(self, duration=None, timeout=0.005):
+        #pull and label the samples until Ctrl+C or for duration seconds, a short timeout keeps the labels within max_latency_s
+        if self.inlet is None:
+            self.connect()
+        print("now labelling postures...")
+        try:
+            while duration is None or local_clock() - self.start_time < duration:
+                samples, timestamps = self.inlet.pull_chunk(timeout=timeout)
+                if timestamps:
+                    self.push_labels(self.add_samples(samples, timestamps), timestamps)
+        except KeyboardInterrupt:
+            pass
+        print(self.get_statistics())
+        return self.get_statistics()
 
 def split_into_sublists(data, range_limit):
     if not data:
@@ -256,13 +330,177 @@ def parse_time(time_str):
     except ValueError:
         return None
     
-def butter_lowpass(cutoff, fs, order=5):
-    return butter(order, cutoff, fs=fs, btype='low', analog=False)
-
-def butter_lowpass_filter(data, cutoff, fs, order=5):
-    b, a = butter_lowpass(cutoff, fs, order=order)
-    y = lfilter(b, a, data)
-    return y
+LOWPASS_SOS = {}    #(cutoff, fs, order) -> second-order sections of the Butterworth low-pass filter
+
+def butter_lowpass_sos(cutoff, fs, order=5):
+    #designed once for each (cutoff, fs, order) and shared by the filters
+    key = (cutoff, fs, order)
+    if key not in LOWPASS_SOS:
+        LOWPASS_SOS[key] = butter(order, cutoff, fs=fs, btype='low', analog=False, output='sos')
+    return LOWPASS_SOS[key]
+
+class LowpassFilter:
+    #causal Butterworth low-pass filter carrying its state between calls, so filtering a signal in one call or sample by sample gives the same output
+    def __init__(self, cutoff, fs, order=5):
+        self.sos = butter_lowpass_sos(cutoff, fs, order)
+        self.reset()
+
+    def reset(self):
+        self.zi = np.zeros((len(self.sos), 2))     #zero initial state, the filter starts at rest
+
+    def filter(self, data):
+        y, self.zi = sosfilt(self.sos, np.atleast_1d(np.asarray(data, dtype=float)), zi=self.zi)
+        return y
+
+class InsoleLoadProcessor:
+    #carried load (kg) from the forces (kg) of the left and right insoles: each foot is low-pass filtered, the feet are summed,
+    #the body weight (initial load) is subtracted and the sum is low-pass filtered again
+    def __init__(self, fs=50, feet_cutoff=1.8, feet_order=1, load_cutoff=0.2, load_order=2, initial_load=None):
+        self.feet_filters = [LowpassFilter(feet_cutoff, fs, feet_order), LowpassFilter(feet_cutoff, fs, feet_order)]
+        self.load_filter = LowpassFilter(load_cutoff, fs, load_order)
+        self.initial_load = initial_load    # kg, body weight
+
+    def find_initial_load(self, left, right, start=10, end=50):
+        #mean of the summed feet from sample start to end, assuming the subject is not holding any load yet
+        self.initial_load = float(np.mean(np.asarray(left[start:end], dtype=float) + np.asarray(right[start:end], dtype=float)))
+        return self.initial_load
+
+    def filter_feet(self, left, right):
+        return self.feet_filters[0].filter(left), self.feet_filters[1].filter(right)
+
+    def sum_feet(self, left, right):
+        #unfiltered carried load from the filtered forces of both feet, summed sample by sample (a foot without a sample counts as 0)
+        total = np.zeros(max(len(left), len(right)))
+        total[:len(left)] += left
+        total[:len(right)] += right
+        return total - self.initial_load
+
+    def filter_load(self, load):
+        return self.load_filter.filter(load)
+
+    def process(self, left, right):
+        #carried load of aligned samples of both feet, the whole recording at once or the new samples of a live stream
+        left, right = self.filter_feet(left, right)
+        return self.filter_load(self.sum_feet(left, right))
+
+class LiveInsoleLoadEstimator:
+    #estimates the carried load from the live Moticon insole streams (l_f and r_f) and publishes it on a carried load stream,
+    #the left samples are paired with the right samples closest in time and processed like the recorded insole loads
+    def __init__(self, name="CarriedLoad", fs=50, initial_load=None, calibration_samples=50, max_latency_s=0.05):
+        self.name = name
+        self.fs = fs
+        self.processor = InsoleLoadProcessor(fs=fs, initial_load=initial_load)
+        self.calibration_samples = calibration_samples      # aligned samples used for the body weight if initial_load is not given
+        self.max_latency_s = max_latency_s
+        self.inlets = None
+        self.outlet = None
+
+        #samples not processed yet: times (s) and loads (kg) of the left and right foot
+        self.left = [np.zeros(0), np.zeros(0)]
+        self.right = [np.zeros(0), np.zeros(0)]
+        self.calibration = [[], [], [], []]     #left loads, right loads, timestamps and arrival times of the aligned samples before the body weight is known
+
+        #counters
+        self.sample_count = 0
+        self.load_count = 0
+        self.late_load_count = 0        # loads published more than max_latency_s after the later of their two samples
+        self.latency_sum = 0
+        self.latency_max = 0
+        self.start_time = None
+
+    def connect(self, left_type="l_f", right_type="r_f"):
+        self.inlets = []
+        for stream_type in [left_type, right_type]:
+            print(f"looking for a {stream_type} stream...")
+            streams = resolve_stream("type", stream_type)
+            self.inlets.append(StreamInlet(streams[0], max_buflen=1, processing_flags=proc_clocksync))     #timestamps of both feet in the local clock
+
+        info = StreamInfo(self.name, "carried_load", 1, self.fs, "float32", self.inlets[0].info().source_id() + "_carried_load")
+        chns = info.desc().append_child("channels")
+        ch = chns.append_child("channel")
+        ch.append_child_value("label", "carried load")
+        ch.append_child_value("unit", "kg")
+        ch.append_child_value("type", "carried_load")
+        self.outlet = StreamOutlet(info)
+        self.start_time = local_clock()
+
+    def align_samples(self):
+        #pairs the pending left samples with the closest right samples, only for left samples not after the last right sample,
+        #since a later right sample cannot be closer to them
+        left_times, left_loads = self.left
+        right_times, right_loads = self.right
+        if not len(left_times) or not len(right_times):
+            return np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0)
+        count = int(np.searchsorted(left_times, right_times[-1], side="right"))
+        times = left_times[:count]
+        after = np.searchsorted(right_times, times, side="left")
+        before = np.maximum(after - 1, 0)
+        after = np.minimum(after, len(right_times) - 1)
+        closest = np.where(np.abs(right_times[before] - times) <= np.abs(right_times[after] - times), before, after)
+
+        #keep the right samples that can still be the closest to the next left samples
+        first = int(closest[-1]) if count else 0
+        self.left = [left_times[count:], left_loads[count:]]
+        self.right = [right_times[first:], right_loads[first:]]
+        return left_loads[:count], right_loads[closest], times, np.maximum(times, right_times[closest])
+
+    def add_samples(self, left_samples, left_timestamps, right_samples, right_timestamps):
+        #carried loads (kg), timestamps (of the left samples) and sample times (of the later of both samples) of the new aligned samples
+        for foot, samples, timestamps in [(self.left, left_samples, left_timestamps), (self.right, right_samples, right_timestamps)]:
+            if len(timestamps):
+                loads = np.asarray(samples, dtype=float)[:, 0]/(9.81*100)     #convert N to kg, force values are multiplied by 100 for some reason
+                foot[0] = np.concatenate([foot[0], np.asarray(timestamps, dtype=float)])
+                foot[1] = np.concatenate([foot[1], loads])
+        left, right, timestamps, sample_times = self.align_samples()
+        self.sample_count += len(timestamps)
+
+        if self.processor.initial_load is None:
+            #wait for enough samples to find the body weight, then process them all like a recording
+            for values, column in zip(self.calibration, [left, right, timestamps, sample_times]):
+                values.extend(column.tolist())
+            if len(self.calibration[0]) < self.calibration_samples:
+                return np.zeros(0), np.zeros(0), np.zeros(0)
+            left, right, timestamps, sample_times = [np.array(values) for values in self.calibration]
+            self.calibration = [[], [], [], []]
+            self.processor.find_initial_load(left, right)
+            print(f"initial load: {self.processor.initial_load} kg")
+
+        if not len(timestamps):
+            return np.zeros(0), np.zeros(0), np.zeros(0)
+        return self.processor.process(left, right), timestamps, sample_times
+
+    def push_loads(self, loads, timestamps, sample_times):
+        for load, timestamp in zip(loads.tolist(), timestamps.tolist()):
+            self.outlet.push_sample([load], timestamp)
+        latencies = local_clock() - sample_times
+        self.load_count += len(latencies)
+        self.late_load_count += int(np.count_nonzero(latencies > self.max_latency_s))
+        self.latency_sum += float(latencies.sum())
+        self.latency_max = max(self.latency_max, float(latencies.max()))
+
+    def get_statistics(self):
+        #latency (s) from the later sample of both feet to the publication of the carried load and throughput (aligned samples/s) since connect
+        elapsed = local_clock() - self.start_time if self.start_time is not None else 0
+        return {"samples": self.sample_count, "loads": self.load_count, "late loads": self.late_load_count,
+                "mean latency": self.latency_sum / self.load_count if self.load_count else 0, "max latency": self.latency_max,
+                "throughput": self.sample_count / elapsed if elapsed > 0 else 0}
+
+    def run(self, duration=None, timeout=0.005):
+        #pull both insole streams and publish the carried load until Ctrl+C or for duration seconds
+        if self.inlets is None:
+            self.connect()
+        print("now estimating carried loads...")
+        try:
+            while duration is None or local_clock() - self.start_time < duration:
+                left_samples, left_timestamps = self.inlets[0].pull_chunk(timeout=timeout)
+                right_samples, right_timestamps = self.inlets[1].pull_chunk(timeout=0.0)
+                loads, timestamps, sample_times = self.add_samples(left_samples, left_timestamps, right_samples, right_timestamps)
+                if len(loads):
+                    self.push_loads(loads, timestamps, sample_times)
+        except KeyboardInterrupt:
+            pass
+        print(self.get_statistics())
+        return self.get_statistics()
 
 def find_distance_carried(carrying_event, pos_data):
     #calculates total distance travelled for specific carrying event
@@ -301,33 +539,47 @@ def main():
 
     #label posture data
     label_posture = False
+    label_offline = True    #label the whole recording at once instead of chunk by chunk
+    label_live = False      #label the live Xsens stream and publish the labels over LSL
+    load_live = False       #estimate the carried load from the live insole streams and publish it over LSL (insoles only)
+
+    #ergonomic feature channels, used for the recorded csv and the live stream
+    #without elbow angles
+    """columns_list = [
+            position_Pelvis_z,
+            Pelvis_T8_x,
+            Pelvis_T8_y,
+            Pelvis_T8_z,
+            jLeftShoulder_y,
+            jLeftShoulder_z,
+            jRightShoulder_y,
+            jRightShoulder_z,
+        ]"""
+    #with elbow angles
+    columns_list = [
+            position_Pelvis_z,
+            jRight_Hip_x,
+            jRight_Hip_y,
+            Vertical_T8_z,
+            jLeftShoulder_y,
+            jLeftShoulder_z,
+            jRightShoulder_y,
+            jRightShoulder_z,
+            jLeftElbow_z,
+            jRightElbow_z,
+        ]
+
+    if load_type == "insoles" and load_live:
+        #publish the carried load of the live insole streams instead of detecting the load events of the recording
+        LiveInsoleLoadEstimator(base_filename + " - CarriedLoad").run()
+        return
+
+    if label_live:
+        #label the postures of the live Xsens stream instead of the recording
+        LivePostureLabeller(columns_list, base_filename + " - AutoDePos").run()
+        return
 
     if label_posture:
-        #without elbow angles
-        """columns_list = [
-                position_Pelvis_z,
-                Pelvis_T8_x,
-                Pelvis_T8_y,
-                Pelvis_T8_z,
-                jLeftShoulder_y,
-                jLeftShoulder_z,
-                jRightShoulder_y,
-                jRightShoulder_z,
-            ]"""
-        #with elbow angles
-        columns_list = [
-                position_Pelvis_z,
-                jRight_Hip_x,
-                jRight_Hip_y,
-                Vertical_T8_z,
-                jLeftShoulder_y,
-                jLeftShoulder_z,
-                jRightShoulder_y,
-                jRightShoulder_z,
-                jLeftElbow_z,
-                jRightElbow_z,
-            ]
-        
         # Read the data in bulk (skip unnecessary lines upfront)
         df_raw = pd.read_csv(ergo_csv, skiprows=8, header=None, names=["timestamp"] + columns_list)  # Adjust `columns_list` as needed
         df_raw["timestamp"] = pd.to_datetime(df_raw["timestamp"])  # Convert timestamps to datetime
@@ -336,34 +588,37 @@ def main():
         chunk_size = 20  # Process 20 rows at a time
         window_size_s = 0.25  # 250 ms in seconds
 
-        #preallocate list to improve memory usage
-        output = [""] * (len(df_raw) // chunk_size + 1)
-        output_index = 0
+        if label_offline:
+            output = label_recording(df_raw, columns_list, chunk_size, window_size_s)
+        else:
+            #preallocate list to improve memory usage
+            output = [""] * (len(df_raw) // chunk_size + 1)
+            output_index = 0
 
-        for start_idx in range(0, len(df_raw), chunk_size):
-            chunk = df_raw.iloc[start_idx:start_idx + chunk_size].copy()
+            for start_idx in range(0, len(df_raw), chunk_size):
+                chunk = df_raw.iloc[start_idx:start_idx + chunk_size].copy()
         
-            # Calculate the rolling window statistics only for the last `window_size_s` window
-            chunk["time_diff"] = (chunk["timestamp"] - chunk["timestamp"].iloc[-1]).dt.total_seconds().abs()
-            filtered_chunk = chunk[chunk["time_diff"] <= window_size_s]
+                # Calculate the rolling window statistics only for the last `window_size_s` window
+                chunk["time_diff"] = (chunk["timestamp"] - chunk["timestamp"].iloc[-1]).dt.total_seconds().abs()
+                filtered_chunk = chunk[chunk["time_diff"] <= window_size_s]
             
-            samples_mean = filtered_chunk[columns_list].mean()
+                samples_mean = filtered_chunk[columns_list].mean()
 
-            # Prepare the labelled dataframe and apply `auto_label`
-            labelled_chunk = pd.DataFrame([samples_mean], columns=columns_list)
-            labelled_chunk["timestamp"] = chunk["timestamp"].iloc[-1]
-            df_labelled = auto_label(labelled_chunk)
+                # Prepare the labelled dataframe and apply `auto_label`
+                labelled_chunk = pd.DataFrame([samples_mean], columns=columns_list)
+                labelled_chunk["timestamp"] = chunk["timestamp"].iloc[-1]
+                df_labelled = auto_label(labelled_chunk)
 
-            # Extract plain values and format the output correctly
-            timestamp_str = labelled_chunk["timestamp"].iloc[0].strftime("%H:%M:%S.%f")[:-3]  # Keep only milliseconds
-            label_str = df_labelled["AutoDePos"].iloc[-1]  # Extract label
-            output[output_index] = f"{timestamp_str},{label_str}"
+                # Extract plain values and format the output correctly
+                timestamp_str = labelled_chunk["timestamp"].iloc[0].strftime("%H:%M:%S.%f")[:-3]  # Keep only milliseconds
+                label_str = df_labelled["AutoDePos"].iloc[-1]  # Extract label
+                output[output_index] = f"{timestamp_str},{label_str}"
 
-            output_index += 1
+                output_index += 1
 
-        for i in range(chunk_size):
-            if output[-i-1] == "":
-                output.pop(-i-1)
+            for i in range(chunk_size):
+                if output[-i-1] == "":
+                    output.pop(-i-1)
         
         #get header
         with open(ergo_csv, "r") as file:
@@ -415,8 +670,9 @@ def main():
         
 
     if load_type == "insoles":
-        #load load data
-        load_data = []
+        #load load data, times (s) and loads (kg) of each foot
+        t = []
+        data = []
 
         #loop over all load csv files
         for filename_load in load_csv:
@@ -428,30 +684,26 @@ def main():
                 start_time_load = parse_time(start_time_line)
 
                 #read load data for each csv file
-                load_data_component = []
+                times = []
+                loads = []
                 for line in lines[8:]:
                     parts = line.strip().split(",")
                     time_str = parts[0]
                     if "." not in time_str:
                         time_str += ".0"
-                    load = float(parts[1])/(9.81*100)                    #convert N to kg, force values are multiplied by 100 for some reason
-                    time_seconds = parse_time(time_str)
-                    load_data_component.append([time_seconds-start_time_load, load])
-                load_data.append(load_data_component)
+                    loads.append(float(parts[1])/(9.81*100))                    #convert N to kg, force values are multiplied by 100 for some reason
+                    times.append(parse_time(time_str)-start_time_load)
+                t.append(np.array(times))
+                data.append(np.array(loads))
 
-        #combine load data and subtract starting value (assume subject not holding any load, so equal to body weight)
-        initial_load = np.mean([sum([load_data[i][j][1] for i in range(len(load_data))]) for j in range(10,50)])
-        print(f"initial load: {initial_load} kg")
-
-        data = [[load[1] for load in load_data[0]], [load[1] for load in load_data[1]]]
-        cutoff = 1.8      #cutoff freq in Hz
-        #cutoff = 20
-        fs = 50          #sample rate in Hz
-        order = 1
+        #filter each foot (1.8 Hz, order 1), then the sum of the feet minus the body weight (0.2 Hz, order 2), sampled at 50 Hz
+        insole_processor = InsoleLoadProcessor(fs=50, feet_cutoff=1.8, feet_order=1, load_cutoff=0.2, load_order=2)
 
-        y = [butter_lowpass_filter(data[0], cutoff, fs, order), butter_lowpass_filter(data[1], cutoff, fs, order)]
+        #starting value of the summed feet (assume subject not holding any load, so equal to body weight)
+        initial_load = insole_processor.find_initial_load(data[0], data[1])
+        print(f"initial load: {initial_load} kg")
 
-        t = [[load[0] for load in load_data[0]], [load[0] for load in load_data[1]]]
+        y = insole_processor.filter_feet(data[0], data[1])
 
         plt.plot(t[0], data[0], 'b-', label='data')
         plt.plot(t[0], y[0], 'g-', linewidth=2, label='filtered data')
@@ -475,33 +727,10 @@ def main():
         plt.subplots_adjust(hspace=0.35)
         plt.show()
 
-        load_data = [[[t[0][i], y[0][i]] for i in range(len(y[0]))], [[t[1][i], y[1][i]] for i in range(len(y[1]))]]
-
-        #sum load components
-        load_data_summed = []
-        max_length = max(len(component) for component in load_data)
-        for i in range(max_length):
-            total_load = 0
-            time_set = False
-            
-            for component in load_data:
-                if i < len(component):
-                    if not time_set:
-                        time_set = True
-                        load_data_summed.append(component[i])            #copy first valid load component
-                    total_load += component[i][1]
-            
-            if time_set:
-                load_data_summed[-1][1] = total_load - initial_load          #update weight value to sum of components and subtract initial weight to get carried weight
-
-        # Filter the data, and plot both the original and filtered signals.
-        data = [load[1] for load in load_data_summed]
-        cutoff = 0.2      #cutoff freq in Hz
-        #cutoff = 10
-        fs = 50          #sample rate in Hz
-        order = 2
-
-        y = butter_lowpass_filter(data, cutoff, fs, order)
+        #sum the feet and filter the carried load, the times are those of the left foot (of the right one after the end of the left one)
+        data = insole_processor.sum_feet(y[0], y[1])
+        y = insole_processor.filter_load(data)
+        t = np.concatenate([t[0], t[1][len(t[0]):]])
 
         """window_size = 50
         numbers_series = pd.Series(data)
@@ -515,7 +744,6 @@ def main():
         y = moving_averages_list[window_size - 1:]"""
 
         #t = [load[0] for load in load_data_summed[window_size - 1:]]
-        t = [load[0] for load in load_data_summed]
 
         #plt.plot(t, data[window_size - 1:], 'b-', label='data')
         plt.plot(t, data, 'b-', label='data')
@@ -529,7 +757,7 @@ def main():
         plt.subplots_adjust(hspace=0.35)
         plt.show()
 
-        load_data_summed = [[t[i], y[i]] for i in range(len(y))]
+        load_data_summed = np.column_stack([t, y]).tolist()
 
     elif load_type == "glasses":
         markers = []
@@ -1,25 +1,41 @@
-from eaws_score import EAWSScore
+from eaws_score import EAWSScore, DEFAULT_EXTRA_LOADS
 from KIM_score import KIMScore
 from participant import Operator
 from task import Task
+from text_overlay import TextOverlay
+from recording_data import PostureData, LoadData, LoadIntervals
+from score_timeline import ScoreTimeline
+from score_pyramid import ScorePyramid, PYRAMID_BUCKET_SIZES
 
 import datetime
 import cv2
+import numpy as np
 import json
 import bisect
-import copy
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
 
 class PhysicalLoad:
-    def __init__(self, score_type, posture_csv, load_csv, operator, task):
+    def __init__(self, score_type, posture_csv, load_csv, operator, task, extra_loads=None):
         self.score_type = score_type
         self.posture_csv = posture_csv
         self.load_csv = load_csv
         self.operator = operator
         self.task = task
         self.score = 0
+        self.extra_loads = extra_loads if extra_loads is not None else DEFAULT_EXTRA_LOADS     #EAWS whole body extra points categories
         self.posture_data, total_duration = self.load_posture_data()
         self.task.duration = total_duration
         self.load_data = self.load_load_data()
+        self.posture_data.episodes = self.posture_data.find_episodes(self.load_data.time)     #postures are scored per episode of the same posture and closest load event
+        self.load_data.intervals = LoadIntervals(self.load_data, self.posture_data)      #load event active at each posture, shared by the scorers and the video overlay
+        self.score_timeline = None
 
     def calculate_TLX_score(self, TLX_csv):
         with open(TLX_csv,"r") as f:
@@ -114,99 +130,105 @@ class PhysicalLoad:
 
     def calculate_score(self):
         if self.score_type == "EAWS":
-            #hardcoded extra points categories, could be passed by production context
-            #0d (joint position wrist) could be detected from hum_joint_angles
-            extra_loads = [
-                {"type": "0a", "intensity": 0},
-                {"type": "0b", "intensity": 0},
-                {"type": "0c", "intensity": 0, "frequency": 0},
-                {"type": "0d", "intensity": 0, "frequency": 0},
-                {"type": "0e", "intensity": 0},
-            ]
-            eaws = EAWSScore(self.operator, self.task, self.posture_data, (copy.deepcopy(self.load_data)))
-            eaws.calculate_whole_body_extra_points(extra_loads)
-            eaws.calculate_posture_score()
+            eaws = self.get_score_timeline().get_eaws()
             print("Posture score: ", eaws.postures_score)
-            eaws.calculate_loads(copy.deepcopy(self.load_data))
             print("Loads score: ", eaws.loads_score)
             self.score = eaws.calculate_eaws_score()
             return self.score
         elif self.score_type == "KIM":
-            kim = KIMScore(self.operator, self.task, self.posture_data, (copy.deepcopy(self.load_data)))
-            kim.calculate_ABP()
-            kim.calculate_LHC(copy.deepcopy(self.load_data))
+            kim = self.get_score_timeline().get_kim()
             self.score = kim.calculate_KIM_score()
             return self.score
         else:
             raise ValueError("Unknown score type")
         
+    def calculate_partial_score(self):
+        #partial aggregate of the session, to be merged with those of the other sessions of a shift (e.g. computed in separate processes)
+        if self.score_type == "EAWS":
+            return self.get_score_timeline().get_partial_scores()[0]
+        elif self.score_type == "KIM":
+            return self.get_score_timeline().get_partial_scores()[1]
+        else:
+            raise ValueError("Unknown score type")
+
+    def calculate_merged_score(self, partial_scores):
+        #score of a shift from the partial aggregates of its sessions (or time chunks), in any order
+        if not partial_scores:
+            raise ValueError("No partial scores to merge")
+        partial_score = partial_scores[0]
+        for other_partial_score in partial_scores[1:]:
+            partial_score = partial_score.merge(other_partial_score)
+        if self.score_type == "EAWS":
+            eaws = EAWSScore(self.operator, self.task, self.posture_data, self.load_data)
+            eaws.calculate_whole_body_extra_points(self.extra_loads)
+            return eaws.calculate_merged_score(partial_score)
+        elif self.score_type == "KIM":
+            kim = KIMScore(self.operator, self.task, self.posture_data, self.load_data)
+            return kim.calculate_merged_score(partial_score)
+        else:
+            raise ValueError("Unknown score type")
+
+    def calculate_scenario_scores(self, extra_loads, extra_conditions=0):
+        #EAWS score of the session for a batch of whole body extra points and load condition scenarios, without scoring the session again.
+        #e.g. extra_loads=[{"type": "0c", "intensity": np.arange(5), "frequency": 6}] gives the score for 0c intensities 0 to 4 at frequency 6
+        eaws = EAWSScore(self.operator, self.task, self.posture_data, self.load_data)
+        return eaws.calculate_scenario_scores(self.get_score_timeline().get_eaws_partial_score(), extra_loads, extra_conditions)
+
     def calculate_intermediate_score(self, time, index):
         if self.score_type == "EAWS":
-            #hardcoded extra points categories, could be passed by production context
-            #0d (joint position wrist) could be detected from hum_joint_angles
-            extra_loads = [
-                {"type": "0a", "intensity": 0},
-                {"type": "0b", "intensity": 0},
-                {"type": "0c", "intensity": 0, "frequency": 0},
-                {"type": "0d", "intensity": 0, "frequency": 0},
-                {"type": "0e", "intensity": 0},
-            ]
-            eaws = EAWSScore(self.operator, self.task, self.posture_data, copy.deepcopy(self.load_data))
-            eaws.calculate_whole_body_extra_points(extra_loads)
-            eaws.calculate_loads(copy.deepcopy(self.load_data), index)
+            eaws = EAWSScore(self.operator, self.task, self.posture_data, self.load_data)
+            eaws.calculate_whole_body_extra_points(self.extra_loads)
+            eaws.calculate_loads(self.load_data, index)
             return eaws.calculate_intermediate_eaws_score(time, index)
         elif self.score_type == "KIM":
-            kim = KIMScore(self.operator, self.task, self.posture_data, copy.deepcopy(self.load_data))
-            kim.calculate_LHC(copy.deepcopy(self.load_data), index)
+            kim = KIMScore(self.operator, self.task, self.posture_data, self.load_data)
+            kim.calculate_LHC(self.load_data, index)
             return kim.calculate_intermediate_KIM_score(time, index)
         else:
             raise ValueError("Unknown score type")
 
+    def get_score_timeline(self):
+        #scores of the session, computed once and shared by calculate_score, the score files and the video overlay
+        if self.score_timeline is None:
+            self.score_timeline = ScoreTimeline(self.operator, self.task, self.posture_data, self.load_data, self.extra_loads)
+        return self.score_timeline
+
     def load_posture_data(self):
         with open(self.posture_csv, 'r') as file:
-            lines = file.readlines()
+            lines = file.read().splitlines()
             # Find and parse the start and end times
             start_time_line = next(line for line in lines if "Start time" in line).strip().split(": ")[1].split()[1]
             end_time_line = next(line for line in lines if "End time" in line).strip().split(": ")[1].split()[1]
             
             start_time = self.parse_time(start_time_line)
             end_time = self.parse_time(end_time_line)
-            total_duration = end_time - start_time
 
             if start_time is None or end_time is None:
                 raise ValueError("Invalid start or end time format")
+            total_duration = end_time - start_time
 
+        # Read posture data into columns
+        rows = [line.strip().split(",") for line in lines[8:-1]]
+        time_seconds = self.parse_time_column([row[0] for row in rows])
+        categories, codes = np.unique(np.array([row[1] for row in rows], dtype=str), return_inverse=True)
 
-            # Read posture data
-            posture_data = []
-            previous_time = None
-            for line in lines[8:-1]:
-                parts = line.strip().split(",")
-                time_str = parts[0]
-                posture = parts[1]
-                time_seconds = self.parse_time(time_str)
-                if previous_time is not None:
-                    duration = time_seconds - previous_time
-                else:
-                    duration = 0  # First line, so duration is 0
-                    
-                posture_data.append({"timestamp": time_seconds-start_time, "time": duration, "posture": posture})
-                previous_time = time_seconds
+        durations = np.zeros(len(time_seconds))     # First line, so duration is 0
+        durations[1:] = np.diff(time_seconds)
+
+        posture_data = PostureData(time_seconds - start_time, durations, codes.astype(np.int32).reshape(-1), categories.tolist())
         
         return posture_data, total_duration
 
     def load_load_data(self):
-        load_data = []
-
         with open(self.load_csv, "r") as file:
-            lines = file.readlines()
+            lines = file.read().splitlines()
             start_time_line = next(line for line in lines if "Start time" in line).strip().split(": ")[1].split()[1]
             start_time = self.parse_time(start_time_line)
 
-            for line in lines[8:]:
-                data = line.split(",")
-                time = data[8].strip()
-                load_data.append({"type": data[0], "transport": data[1], "weight": float(data[2]), "posture": int(data[3]), "conditions": int(data[4]), "frequency": int(data[5]), "duration": float(data[6]), "distance": float(data[7]), "time": float(self.parse_time(time))-start_time})
+        columns = list(zip(*[line.split(",") for line in lines[8:]])) or [()]*9
+        load_data = LoadData(np.array(columns[0], dtype=str), np.array(columns[1], dtype=str), np.array(columns[2], dtype=float), np.array(columns[3], dtype=np.int64),
+                             np.array(columns[4], dtype=np.int64), np.array(columns[5], dtype=np.int64), np.array(columns[6], dtype=float), np.array(columns[7], dtype=float),
+                             self.parse_time_column([time.strip() for time in columns[8]]) - start_time)
         
         return load_data
     
@@ -221,6 +243,32 @@ class PhysicalLoad:
         except ValueError:
             return None
     
+    def parse_time_column(self, time_strs):
+        #parse_time for a whole column of "HH:MM:SS.ffffff" strings at once, in float64 seconds
+        time_strs = np.array(time_strs, dtype="S")
+        if len(time_strs) == 0:
+            return np.zeros(0)
+        chars = time_strs.view(np.uint8).reshape(len(time_strs), -1).astype(np.int64)
+        digits = chars - ord("0")
+        fraction = digits[:, 9:15]
+        fraction = np.where(chars[:, 9:15] == 0, 0, fraction)      #shorter fractions are padded with zero bytes
+        valid = (chars.shape[1] >= 10 and chars.shape[1] <= 15 and np.all(chars[:, [2, 5]] == ord(":")) and np.all(chars[:, 8] == ord("."))
+                 and np.all((digits[:, [0, 1, 3, 4, 6, 7, 9]] >= 0) & (digits[:, [0, 1, 3, 4, 6, 7, 9]] <= 9)) and np.all((fraction >= 0) & (fraction <= 9))
+                 and np.all(np.diff(chars[:, 9:15] == 0, axis=1) >= 0))
+        if valid:
+            hours = digits[:, 0]*10 + digits[:, 1]
+            minutes = digits[:, 3]*10 + digits[:, 4]
+            seconds = digits[:, 6]*10 + digits[:, 7]
+            valid = np.all(hours < 24) and np.all(minutes < 60) and np.all(seconds < 62)
+        if not valid:
+            #other formats (e.g. without fraction) are parsed one by one
+            seconds = [self.parse_time(time_str) for time_str in time_strs.astype(str)]
+            if None in seconds:
+                raise ValueError("Invalid time format")
+            return np.array(seconds, dtype=float)
+        microseconds = fraction @ (10**np.arange(5, 5 - fraction.shape[1], -1))
+        return (hours*3600 + minutes*60 + seconds) + microseconds / 1e6
+
     def save_physical_scores_to_file(self):
         #get start time and end time from posture data
         with open(self.posture_csv, 'r') as file:
@@ -241,8 +289,7 @@ class PhysicalLoad:
 
         #write EAWS scores to file
         scores = []
-        for index, posture in enumerate(self.posture_data):
-            whole_body_extra_score, posture_score, loads_score, eaws_score = self.calculate_intermediate_score(posture["timestamp"], index)
+        for posture, (whole_body_extra_score, posture_score, loads_score, eaws_score) in zip(self.posture_data, self.get_score_timeline().get_eaws_timeline()):
             scores.append([str(datetime.timedelta(seconds = posture["timestamp"] + start_time)), eaws_score, whole_body_extra_score, posture_score, 0, loads_score, 0, baseline_score, NASA_TLX_score])
 
         filename = self.posture_csv.split(" ")[0] + "_EAWS.csv"
@@ -254,193 +301,366 @@ class PhysicalLoad:
                 file.write(",".join([str(i) for i in score])+"\n")
 
         #write KIM scores to file
-            self.score_type = "KIM"
-            scores = []
-            for index, posture in enumerate(self.posture_data):
-                kim_scores = self.calculate_intermediate_score(posture["timestamp"], index)
-                scores.append([str(datetime.timedelta(seconds = posture["timestamp"] + start_time))] + sum([[kim_scores[i][0], kim_scores[i][1]] for i in range(len(kim_scores))],[]) + [baseline_score, NASA_TLX_score])
+        scores = []
+        for posture, kim_scores in zip(self.posture_data, self.get_score_timeline().get_kim_timeline()):
+            scores.append([str(datetime.timedelta(seconds = posture["timestamp"] + start_time))] + sum([[kim_scores[i][0], kim_scores[i][1]] for i in range(len(kim_scores))],[]) + [baseline_score, NASA_TLX_score])
 
         filename = self.posture_csv.split(" ")[0] + "_KIM.csv"
 
         with open(filename,"w") as file:
             file.write("Name: Physical Score\nType: KIM\nChannels: 15\nSRate: unknown\n" + header[-3] + header[-2] + "\n")
-            file.write("time [HH:mm:ss.fff],time rating MHO, intensity MHO,time rating ABP,intensity ABP,time rating BM,intensity BM,time rating BF,intensity BF,time rating LHC,intensity LHC,time rating PP,intensity PP,baseline score,NASA TLX score\n")
+            file.write("time [HH:mm:ss.fff],time rating MHO,intensity MHO,time rating ABP,intensity ABP,time rating BM,intensity BM,time rating BF,intensity BF,time rating LHC,intensity LHC,time rating PP,intensity PP,baseline score,NASA TLX score\n")
             for score in scores:
                 file.write(",".join([str(i) for i in score])+"\n")
-        
-        self.score_type = "EAWS"
 
         print("Scores saved to file.")
 
-    def process_video_with_posture(self, input_vid_filepath, output_vid_filepath):        
-        #get start time and end time from posture data
-        with open(self.posture_csv, 'r') as file:
-            lines = file.readlines()
-            header = lines[:7]
-            # Find and parse the start and end times
-            start_time_line = next(line for line in lines if "Start time" in line).strip().split(": ")[1].split()[1]
-            end_time_line = next(line for line in lines if "End time" in line).strip().split(": ")[1].split()[1]
-            
-            start_time = self.parse_time(start_time_line)
-            end_time = self.parse_time(end_time_line)
+    def save_score_track_to_file(self, output_filepath=None, track_format="vtt"):
+        #write the scores shown in the video overlay as a timed text track (WebVTT) or a JSON track, so they can be played next to the original video without re-encoding it
+        if track_format not in ["vtt", "json"]:
+            raise ValueError("Unknown track format")
+        if output_filepath is None:
+            output_filepath = self.posture_csv.split(" ")[0] + "_scores." + track_format
 
-            if start_time is None or end_time is None:
-                raise ValueError("Invalid start or end time format")
+        overlay_scores = self.get_score_timeline().get_overlay_scores()
 
-        baseline_score = self.calculate_baseline_score("Wellficiency_baseline_survey.csv")
-        NASA_TLX_score = self.calculate_TLX_score("Wellficiency_NASA_TLX.csv")
-
-        #write EAWS scores to file
-        scores = []
+        #one cue per posture, from its timestamp up to the timestamp of the next posture (end of the recording for the last one)
+        cues = []
         for index, posture in enumerate(self.posture_data):
-            whole_body_extra_score, posture_score, loads_score, eaws_score = self.calculate_intermediate_score(posture["timestamp"], index)
-            scores.append([str(datetime.timedelta(seconds = posture["timestamp"] + start_time)), eaws_score, whole_body_extra_score, posture_score, 0, loads_score, 0, baseline_score, NASA_TLX_score])
-
-        filename = self.posture_csv.split(" ")[0] + "_EAWS.csv"
-
-        with open(filename,"w") as file:
-            file.write("Name: Physical Score\nType: EAWS\nChannels: 9\nSRate: unknown\n" + header[-3] + header[-2] + "\n")
-            file.write("time [HH:mm:ss.fff],EAWS score,whole body extra score,posture score,forces score,loads score,upper limbs score,baseline score,NASA TLX score\n")
-            for score in scores:
-                file.write(",".join([str(i) for i in score])+"\n")
-
-        #write KIM scores to file
-            self.score_type = "KIM"
-            scores = []
-            for index, posture in enumerate(self.posture_data):
-                kim_scores = self.calculate_intermediate_score(posture["timestamp"], index)
-                scores.append([str(datetime.timedelta(seconds = posture["timestamp"] + start_time))] + sum([[kim_scores[i][0], kim_scores[i][1]] for i in range(len(kim_scores))],[]) + [baseline_score, NASA_TLX_score])
-
-        filename = self.posture_csv.split(" ")[0] + "_KIM.csv"
+            start = posture["timestamp"]
+            if index + 1 < len(self.posture_data):
+                end = self.posture_data[index + 1]["timestamp"]
+            else:
+                end = max(self.task.duration, start)
+            #same load as shown in the video overlay at the start of the cue
+            load = self.load_data[self.load_data.intervals.find_current_load(start)] if self.load_data else None
+            whole_body_extra_score, posture_score, loads_score, eaws_score, KIM_score = overlay_scores[index]
+            cue = {"start": start, "end": end, "posture": posture["posture"],
+                   "load weight": load["weight"] if load else None, "load type": load["type"] if load else None,
+                   "whole body extra score": whole_body_extra_score, "posture score": posture_score, "loads score": loads_score,
+                   "EAWS score": eaws_score, "KIM score": KIM_score}
+
+            #merge with the previous cue if nothing shown changed
+            if cues and all(cues[-1][key] == cue[key] for key in cue if key not in ["start", "end"]):
+                cues[-1]["end"] = end
+            else:
+                cues.append(cue)
+
+        with open(output_filepath, "w") as file:
+            if track_format == "json":
+                json.dump({"operator": self.operator.name, "task": self.task.name, "duration": self.task.duration, "cues": cues}, file, indent=1)
+            else:
+                file.write("WEBVTT\n\n")
+                for cue in cues:
+                    file.write(f"{self.format_track_time(cue['start'])} --> {self.format_track_time(cue['end'])} line:0 position:0% align:start\n")
+                    file.write(f"Posture: {cue['posture']}\n")
+                    file.write(f"Whole body extra points: {cue['whole body extra score']}\n")
+                    file.write(f"Posture score: {cue['posture score']}\n")
+                    file.write(f"Load score: {cue['loads score']}\n")
+                    file.write(f"Load: {cue['load weight']} kg; {cue['load type']}\n")
+                    file.write(f"EAWS: {cue['EAWS score']}\n")
+                    file.write(f"KIM: {cue['KIM score']}\n\n")
+
+        print(f"Score track saved to: {output_filepath}")
+        return cues
+
+    def save_score_pyramid_to_file(self, output_filepath=None):
+        #write min, max and last EAWS and KIM scores per 1 s, 10 s, 1 min and 10 min to a binary file (see ScorePyramid), for viewers of whole shifts
+        if output_filepath is None:
+            output_filepath = self.posture_csv.split(" ")[0] + "_scores.pyr"
+
+        overlay_scores = self.get_score_timeline().get_overlay_scores()
+        channels = ["EAWS score", "whole body extra score", "posture score", "loads score", "KIM score"]
+        values = [[eaws_score, whole_body_extra_score, posture_score, loads_score, KIM_score]
+                  for whole_body_extra_score, posture_score, loads_score, eaws_score, KIM_score in overlay_scores.values()]
+
+        score_pyramid = ScorePyramid(channels)
+        for bucket_size in PYRAMID_BUCKET_SIZES:
+            score_pyramid.add_level(bucket_size, self.posture_data.timestamp, values)
+        score_pyramid.save(output_filepath)
+        print(f"Score pyramid saved to: {output_filepath}")
+
+    def format_track_time(self, seconds):
+        #HH:MM:SS.mmm as used by WebVTT
+        milliseconds = int(round(seconds * 1000))
+        return f"{milliseconds // 3600000:02d}:{milliseconds // 60000 % 60:02d}:{milliseconds // 1000 % 60:02d}.{milliseconds % 1000:03d}"
+
+    def process_video_with_posture(self, input_vid_filepath, output_vid_filepath, headless=False, preview_every=1, queue_size=64, workers=1):        
+        self.save_physical_scores_to_file()
+
+        #precomputed overlay lines for each posture index and load event, so each frame only needs a bisect and a lookup
+        video_overlay = self.get_video_overlay()
+
+        start = time.perf_counter()
+        if workers > 1:
+            stats = self.render_video_segments(input_vid_filepath, output_vid_filepath, video_overlay, workers, queue_size)
+        else:
+            stats = render_video(input_vid_filepath, output_vid_filepath, video_overlay, headless=headless, preview_every=preview_every, queue_size=queue_size)
+        if stats is None:
+            return
+        elapsed = time.perf_counter() - start
 
-        with open(filename,"w") as file:
-            file.write("Name: Physical Score\nType: KIM\nChannels: 15\nSRate: unknown\n" + header[-3] + header[-2] + "\n")
-            file.write("time [HH:mm:ss.fff],time rating MHO,intensity MHO,time rating ABP,intensity ABP,time rating BM,intensity BM,time rating BF,intensity BF,time rating LHC,intensity LHC,time rating PP,intensity PP,baseline score,NASA TLX score\n")
-            for score in scores:
-                file.write(",".join([str(i) for i in score])+"\n")
-        
-        self.score_type = "EAWS"
+        print(f"Video with posture saved to: {output_vid_filepath}")
+        print(f"Rendered {stats['frames']} frames in {elapsed:.1f} s ({stats['frames']/elapsed:.1f} fps, source {stats['fps']:.1f} fps)")
+        for stage in ["decode", "annotate", "encode"]:
+            if stats[stage] > 0:
+                print(f"  {stage}: {stats['frames']/stats[stage]:.1f} fps ({stats[stage]:.1f} s busy)")
+        return stats
+
+    def get_video_overlay(self):
+        #overlay lines of the video, see VideoOverlay
+        overlay_scores = self.get_score_timeline().get_overlay_scores()
+        posture_lines = []
+        for index, posture in enumerate(self.posture_data.posture):
+            whole_body_extra_score, posture_score, loads_score, eaws_score, KIM_score = overlay_scores[index]
+            posture_lines.append((
+                [f"Posture: {posture}", f"Whole body extra points: {whole_body_extra_score}", f"Posture score: {posture_score}", f"Load score: {loads_score}"],
+                [f"EAWS: {eaws_score}", f"KIM: {KIM_score}"],
+            ))
+        load_lines = [f"Load: {load['weight']} kg; {load['type']}" for load in self.load_data]
+        return VideoOverlay(self.posture_data.timestamp.tolist(), posture_lines, self.load_data.intervals, load_lines)
+
+    def render_video_segments(self, input_vid_filepath, output_vid_filepath, video_overlay, workers, queue_size=64):
+        #render segments of the video in separate processes and join them without re-encoding
+        if shutil.which("ffmpeg") is None:
+            print("ffmpeg not found, rendering video in a single process")
+            return render_video(input_vid_filepath, output_vid_filepath, video_overlay, headless=True, queue_size=queue_size)
 
-        print("Scores saved to file.")
-        
-        # Open the video capture object
         cap = cv2.VideoCapture(input_vid_filepath)
-
-        # Check if video opened successfully
         if not cap.isOpened():
             print("Error opening video!")
             return
-
-        # Define text properties
-        font_face = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 0.7
-        font_thickness = 1
-        text_color = (255, 255, 255)  # White color in BGR format
-        text_bg_color = (0, 0, 0)  # Black background color
-
-        # Get video properties for output video
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # Adjust fourcc for different codecs (e.g., MP4: 'XVID')
         fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-        # Create video writer object with the obtained properties
-        out = cv2.VideoWriter(output_vid_filepath, fourcc, fps, (frame_width, frame_height))
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
 
-        cumulative_duration_posture = 0 # TODO: Change Delay between beginning of video and beginning of recording (when pressing record in datamanager)
-        current_posture_index = 0
-        closest_posture = None
-        cumulative_duration_load = 0
-        current_load_index = 0
-        closest_load = None
+        boundaries = self.find_segment_boundaries(input_vid_filepath, fps, frame_count, workers)
+        boundaries[-1] = None       #let the last segment run until the end of the video, the frame count is not always exact
 
+        segment_dir = tempfile.mkdtemp(prefix="segments_", dir=os.path.dirname(os.path.abspath(output_vid_filepath)))
+        try:
+            segment_files = [os.path.join(segment_dir, f"segment_{i}.mp4") for i in range(len(boundaries)-1)]
+            #the overlay is sent once to each worker, the tasks only carry the frame range and the paths
+            segment_args = [(input_vid_filepath, segment_files[i], boundaries[i], boundaries[i+1], queue_size) for i in range(len(segment_files))]
+            with multiprocessing.Pool(min(workers, len(segment_args)), initializer=init_segment_worker, initargs=(video_overlay,)) as pool:
+                segment_stats = pool.starmap(render_video_segment, segment_args)
+            if any(stats is None for stats in segment_stats):
+                return
+
+            #concatenate the segments by copying the encoded streams
+            segment_list = os.path.join(segment_dir, "segments.txt")
+            with open(segment_list, "w") as file:
+                for segment_file in segment_files:
+                    file.write("file '" + segment_file.replace("\\", "/").replace("'", "'\\''") + "'\n")
+            subprocess.run(["ffmpeg", "-v", "error", "-y", "-f", "concat", "-safe", "0", "-i", segment_list, "-c", "copy", output_vid_filepath], check=True)
+        finally:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+
+        stats = {"frames": 0, "fps": fps, "decode": 0, "annotate": 0, "encode": 0}
+        for key in ["frames", "decode", "annotate", "encode"]:
+            stats[key] = sum([segment[key] for segment in segment_stats])
+        return stats
+
+    def find_segment_boundaries(self, input_vid_filepath, fps, frame_count, segments):
+        #split the video into segments of about equal length, starting at keyframes if ffprobe can list them
+        keyframes = []
+        if shutil.which("ffprobe") is not None:
+            result = subprocess.run(["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", input_vid_filepath], capture_output=True, text=True)
+            packet_times = []
+            keyframe_times = []
+            for line in result.stdout.splitlines():
+                parts = line.split(",")
+                if len(parts) < 2:
+                    continue
+                try:
+                    pts_time = float(parts[0])
+                except ValueError:
+                    continue
+                packet_times.append(pts_time)
+                if "K" in parts[1]:
+                    keyframe_times.append(pts_time)
+            #frame numbers count from the first frame shown, streams do not always start at a pts of 0
+            if packet_times:
+                start_time = min(packet_times)
+                keyframes = [round((keyframe_time - start_time)*fps) for keyframe_time in keyframe_times]
+        else:
+            print("ffprobe not found, video segments do not start at keyframes and take longer to seek")
+
+        boundaries = [0]
+        for i in range(1, segments):
+            boundary = round(i*frame_count/segments)
+            if keyframes:
+                boundary = min(keyframes, key=lambda keyframe: abs(keyframe - boundary))
+            if boundaries[-1] < boundary < frame_count:
+                boundaries.append(boundary)
+        boundaries.append(frame_count)
+        return boundaries
+
+class VideoOverlay:
+    #text lines of the video overlay: the posture and score lines of each posture index and the load line of each load event,
+    #built once from the score timeline, so a frame (or a segment rendered in another process) needs only these lines and the timestamps
+    def __init__(self, posture_timestamps, posture_lines, load_intervals, load_lines):
+        self.posture_timestamps = posture_timestamps    # list of the posture timestamps, for bisect
+        self.posture_lines = posture_lines              # (lines before the load line, lines after it) of each posture index
+        self.load_intervals = load_intervals            # LoadIntervals of the load events
+        self.load_lines = load_lines                    # load line of each load event
+
+    def annotate_frame(self, frame, elapsed_time, frame_index, text_overlay):
+        current_posture_index, current_load_index = frame_index
+
+        #Find the posture for which the timestamp is closest to and below the elapsed time
+        current_posture_index = max(0, bisect.bisect_left(self.posture_timestamps,elapsed_time,current_posture_index)-1)
+        if current_posture_index >= len(self.posture_timestamps):
+            current_posture_index -= 1
+
+        #same for load
+        current_load_index = self.load_intervals.find_current_load(elapsed_time)
+        if current_load_index >= len(self.load_lines):
+            current_load_index -= 1
+
+        lines = [f"Timestamp: {elapsed_time}"[:-4]]
+
+        if current_posture_index >= 0 and current_load_index >= 0:
+            # Overlay closest posture and corresponding timestamp
+            posture_lines, score_lines = self.posture_lines[current_posture_index]
+            lines += posture_lines + [self.load_lines[current_load_index]] + score_lines
+
+        # Draw the text lines (on a black background) every 25 pixels, sprites are only rasterised when the text changes
+        text_overlay.draw(frame, [(text, (10, 25*(i+1))) for i, text in enumerate(lines)])
+
+        return [current_posture_index, current_load_index]
+
+SEGMENT_OVERLAY = None      #VideoOverlay of the segment worker processes, set once per process by init_segment_worker
+
+def init_segment_worker(video_overlay):
+    global SEGMENT_OVERLAY
+    SEGMENT_OVERLAY = video_overlay
+
+def render_video_segment(input_vid_filepath, output_vid_filepath, start_frame, end_frame, queue_size=64):
+    return render_video(input_vid_filepath, output_vid_filepath, SEGMENT_OVERLAY, start_frame, end_frame, headless=True, preview_every=0, queue_size=queue_size)
+
+def render_video(input_vid_filepath, output_vid_filepath, video_overlay, start_frame=0, end_frame=None, headless=False, preview_every=1, queue_size=64):
+    #render the overlay on the frames from start_frame up to end_frame (end of the video if None)
+
+    # Open the video capture object
+    cap = cv2.VideoCapture(input_vid_filepath)
+
+    # Check if video opened successfully
+    if not cap.isOpened():
+        print("Error opening video!")
+        return
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    # Get video properties for output video
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # Adjust fourcc for different codecs (e.g., MP4: 'XVID')
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    # Create video writer object with the obtained properties
+    out = cv2.VideoWriter(output_vid_filepath, fourcc, fps, (frame_width, frame_height))
+
+    #decoding and encoding run in their own threads, connected to the annotation loop by bounded queues
+    stats = {"frames": 0, "fps": fps, "decode": 0, "annotate": 0, "encode": 0}
+    decoded_frames = queue.Queue(maxsize=queue_size)
+    annotated_frames = queue.Queue(maxsize=queue_size)
+    stop_decoding = threading.Event()
+    max_frames = end_frame - start_frame if end_frame is not None else None
+    decoder = threading.Thread(target=decode_video_frames, args=(cap, decoded_frames, stop_decoding, stats, max_frames))
+    encoder_errors = []
+    encoder = threading.Thread(target=encode_video_frames, args=(out, annotated_frames, stats, encoder_errors))
+    decoder.start()
+    encoder.start()
+
+    # TODO: Change Delay between beginning of video and beginning of recording (when pressing record in datamanager)
+    frame_index = [0, 0]     #current posture and load index
+    text_overlay = TextOverlay()
+    try:
         while True:
-            # Capture frame-by-frame
-            frame_exists, frame = cap.read()
-
-            if not frame_exists:
+            decoded = decoded_frames.get()
+            if decoded is None:
                 break
+            frame, elapsed_time = decoded
 
-            # Calculate elapsed time
-            elapsed_time = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
-
-            #Find the posture for which the timestamp is closest to and below the elapsed time
-            posture_data_timestamps = [i["timestamp"] for i in self.posture_data]
-            current_posture_index = max(0, bisect.bisect_left(posture_data_timestamps,elapsed_time,current_posture_index)-1)
-            if current_posture_index >= len(self.posture_data):
-                current_posture_index -= 1
-            closest_posture = self.posture_data[current_posture_index]
-            cumulative_duration_posture = closest_posture['timestamp']
-
-            #same for load
-            load_data_timestamps = [i["time"] for i in self.load_data]
-            current_load_index = max(0, bisect.bisect_left(load_data_timestamps,elapsed_time,current_load_index)-1)
-            if current_load_index >= len(self.load_data):
-                current_load_index -= 1
-            closest_load = self.load_data[current_load_index]
-            
-            text = f"Timestamp: {elapsed_time}"[:-4]
-
-            text_size = cv2.getTextSize(text, font_face, font_scale, font_thickness)[0]
-            cv2.rectangle(frame, (10, 25 - text_size[1]), (10 + text_size[0], 25), text_bg_color, -1)
-            cv2.putText(frame, text, (10, 25), font_face, font_scale, text_color, font_thickness, cv2.LINE_AA)
-            
-            if closest_posture is not None and closest_load is not None:
-                # Overlay closest posture and corresponding timestamp
-                posture_text = f"Posture: {closest_posture['posture']}"
-                # Draw a filled rectangle as background for the text
-                text_size = cv2.getTextSize(posture_text, font_face, font_scale, font_thickness)[0]
-                cv2.rectangle(frame, (10, 50 - text_size[1]), (10 + text_size[0], 50), text_bg_color, -1)
-                cv2.putText(frame, posture_text, (10, 50), font_face, font_scale, text_color, font_thickness, cv2.LINE_AA)
-                whole_body_extra_score, posture_score, loads_score, eaws_score = self.calculate_intermediate_score(cumulative_duration_posture, current_posture_index)
-                eaws_text = f"Whole body extra points: {whole_body_extra_score}"
-                text_size = cv2.getTextSize(eaws_text, font_face, font_scale, font_thickness)[0]
-                cv2.rectangle(frame, (10, 75 - text_size[1]), (10 + text_size[0], 75), text_bg_color, -1)
-                cv2.putText(frame, eaws_text, (10, 75), font_face, font_scale, text_color, font_thickness, cv2.LINE_AA)
-                eaws_text = f"Posture score: {posture_score}"
-                text_size = cv2.getTextSize(eaws_text, font_face, font_scale, font_thickness)[0]
-                cv2.rectangle(frame, (10, 100 - text_size[1]), (10 + text_size[0], 100), text_bg_color, -1)
-                cv2.putText(frame, eaws_text, (10, 100), font_face, font_scale, text_color, font_thickness, cv2.LINE_AA)
-                eaws_text = f"Load score: {loads_score}"
-                text_size = cv2.getTextSize(eaws_text, font_face, font_scale, font_thickness)[0]
-                cv2.rectangle(frame, (10, 125 - text_size[1]), (10 + text_size[0], 125), text_bg_color, -1)
-                cv2.putText(frame, eaws_text, (10, 125), font_face, font_scale, text_color, font_thickness, cv2.LINE_AA)
-                eaws_text = f"Load: {closest_load['weight']} kg; {closest_load['type']}"
-                text_size = cv2.getTextSize(eaws_text, font_face, font_scale, font_thickness)[0]
-                cv2.rectangle(frame, (10, 150 - text_size[1]), (10 + text_size[0], 150), text_bg_color, -1)
-                cv2.putText(frame, eaws_text, (10, 150), font_face, font_scale, text_color, font_thickness, cv2.LINE_AA)
-                eaws_text = f"EAWS: {eaws_score}"
-                text_size = cv2.getTextSize(eaws_text, font_face, font_scale, font_thickness)[0]
-                cv2.rectangle(frame, (10, 175 - text_size[1]), (10 + text_size[0], 175), text_bg_color, -1)
-                cv2.putText(frame, eaws_text, (10, 175), font_face, font_scale, text_color, font_thickness, cv2.LINE_AA)
-                self.score_type = "KIM"
-                KIM_scores = self.calculate_intermediate_score(cumulative_duration_posture, current_posture_index)
-                KIM_score = sum([KIM_scores[i][0]*KIM_scores[i][1] for i in range(len(KIM_scores))])
-                kim_text = f"KIM: {KIM_score}"
-                text_size = cv2.getTextSize(kim_text, font_face, font_scale, font_thickness)[0]
-                cv2.rectangle(frame, (10, 200 - text_size[1]), (10 + text_size[0], 200), text_bg_color, -1)
-                cv2.putText(frame, kim_text, (10, 200), font_face, font_scale, text_color, font_thickness, cv2.LINE_AA)
-                self.score_type = "EAWS"
-                
-
-            # Display the resulting frame
-            cv2.imshow('Video with Posture', frame)
-
-            # Write the frame to the output video
-            out.write(frame)
+            annotate_start = time.perf_counter()
+            frame_index = video_overlay.annotate_frame(frame, elapsed_time, frame_index, text_overlay)
+            stats["annotate"] += time.perf_counter() - annotate_start
 
-            # Wait for key press
-            key = cv2.waitKey(1)
-            if key == ord('q'):
+            # Write the frame to the output video (stop if the encoder failed, its error is raised below)
+            if not put_while_alive(annotated_frames, frame, encoder):
                 break
-            
+            stats["frames"] += 1
+
+            # Display the resulting frame (every preview_every frames) and wait for key press
+            if not headless and preview_every and stats["frames"] % preview_every == 0:
+                cv2.imshow('Video with Posture', frame)
+                key = cv2.waitKey(1)
+                if key == ord('q'):
+                    break
+    finally:
+        stop_decoding.set()
+        put_while_alive(annotated_frames, None, encoder)
+        decoder.join()
+        encoder.join()
 
         # Release the video capture object and close all windows
         cap.release()
         out.release()
-        cv2.destroyAllWindows()
+        if not headless:
+            cv2.destroyAllWindows()
+
+    if encoder_errors:
+        raise encoder_errors[0]
+    return stats
+
+def decode_video_frames(cap, frame_queue, stop_event, stats, max_frames=None):
+    #read frames and their timestamps until the end of the video (or max_frames) or until rendering is stopped
+    frame_count = 0
+    try:
+        while not stop_event.is_set() and (max_frames is None or frame_count < max_frames):
+            decode_start = time.perf_counter()
+            frame_exists, frame = cap.read()
+            if not frame_exists:
+                break
+            # Calculate elapsed time
+            elapsed_time = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            stats["decode"] += time.perf_counter() - decode_start
+            frame_count += 1
+            put_unless_stopped(frame_queue, (frame, elapsed_time), stop_event)
+    finally:
+        put_unless_stopped(frame_queue, None, stop_event)
+
+def put_unless_stopped(frame_queue, item, stop_event):
+    while not stop_event.is_set():
+        try:
+            frame_queue.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
 
-        print(f"Video with posture saved to: {output_vid_filepath}")
+def put_while_alive(frame_queue, item, consumer):
+    #put item on the queue unless the thread consuming it has stopped, False if it has
+    while consumer.is_alive():
+        try:
+            frame_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def encode_video_frames(out, frame_queue, stats, errors):
+    #write the annotated frames until None, an error stops the thread and is kept in errors for the annotation loop
+    try:
+        while True:
+            frame = frame_queue.get()
+            if frame is None:
+                break
+            encode_start = time.perf_counter()
+            out.write(frame)
+            stats["encode"] += time.perf_counter() - encode_start
+    except Exception as error:
+        errors.append(error)
 
 
 
@@ -458,4 +678,8 @@ if __name__ == "__main__":
 
         physical_load.process_video_with_posture("sess1_JohnD.mp4", "output_sess1_JohnD.mp4")
     elif operation == "files":
-        physical_load.save_physical_scores_to_file()
\ No newline at end of file
+        physical_load.save_physical_scores_to_file()
+    elif operation == "track":
+        physical_load.save_score_track_to_file()
+    elif operation == "pyramid":
+        physical_load.save_score_pyramid_to_file()
\ No newline at end of file
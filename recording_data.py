@@ -0,0 +1,131 @@
+import numpy as np
+
+class PostureData:
+    def __init__(self, timestamp, time, code, categories, lookup_tables=None):
+        self.timestamp = timestamp      # float64, seconds since the start of the recording
+        self.time = time                # float64, seconds since the previous posture (0 for the first one)
+        self.code = code                # int32, index of the posture in categories
+        self.categories = categories    # list of the distinct posture strings, e.g. "St_U_FR0_TR0_LB1"
+        self.lookup_tables = lookup_tables if lookup_tables is not None else {}    # name -> value for each category, see lookup
+        self.episodes = None            # PostureEpisodes of the rows, see find_episodes
+        for column in [self.timestamp, self.time, self.code]:
+            column.flags.writeable = False     #shared read-only by the scorers
+
+    @property
+    def posture(self):
+        return [self.categories[code] for code in self.code.tolist()]
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def __getitem__(self, index):
+        #a slice or mask gives a PostureData sharing the categories, an index gives the row as a dict like the old posture_data entries
+        if isinstance(index, (slice, np.ndarray)):
+            return PostureData(self.timestamp[index], self.time[index], self.code[index], self.categories, self.lookup_tables)
+        return {"timestamp": float(self.timestamp[index]), "time": float(self.time[index]), "posture": self.categories[self.code[index]]}
+
+    def __iter__(self):
+        for timestamp, time, code in zip(self.timestamp.tolist(), self.time.tolist(), self.code.tolist()):
+            yield {"timestamp": timestamp, "time": time, "posture": self.categories[code]}
+
+    def lookup(self, name, function):
+        #table of function(posture) for each distinct posture, indexed by code, so the scorers parse each posture string once instead of once per row
+        if name not in self.lookup_tables:
+            self.lookup_tables[name] = [function(posture) for posture in self.categories]
+        return self.lookup_tables[name]
+
+    def find_episodes(self, split_times=None):
+        #run-length encoding of the rows: runs of consecutive rows with the same posture,
+        #also split between two rows with a time of split_times (e.g. the load events) in between
+        if not len(self):
+            return PostureEpisodes(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0))
+        new_episode = np.ones(len(self), dtype=bool)
+        new_episode[1:] = self.code[1:] != self.code[:-1]
+        if split_times is not None and len(split_times):
+            interval = np.searchsorted(split_times, self.timestamp, side="right")
+            new_episode[1:] |= interval[1:] != interval[:-1]
+        start = np.flatnonzero(new_episode)
+        end = np.append(start[1:], len(self))
+        return PostureEpisodes(start, end, self.code[start], np.add.reduceat(self.time, start))
+
+    def cut_episodes(self, episodes, end):
+        #the episodes of the rows before end (as in [:end]), the last one shortened if end lies within it
+        end = slice(end).indices(len(self))[1]
+        count = int(np.searchsorted(episodes.start, end, side="left"))
+        cut = episodes[:count]
+        if count and cut.end[-1] > end:
+            cut_end = cut.end.copy()
+            cut_time = cut.time.copy()
+            cut_end[-1] = end
+            cut_time[-1] = np.add.reduce(self.time[cut.start[-1]:end])
+            cut = PostureEpisodes(cut.start, cut_end, cut.code, cut_time)
+        return cut
+
+class PostureEpisodes:
+    def __init__(self, start, end, code, time):
+        self.start = start      # int64, index of the first row of each episode
+        self.end = end          # int64, index after the last row of each episode
+        self.code = code        # int32, posture code of each episode
+        self.time = time        # float64, duration of each episode (sum of the durations of its rows)
+
+    def __len__(self):
+        return len(self.start)
+
+    def __getitem__(self, index):
+        return PostureEpisodes(self.start[index], self.end[index], self.code[index], self.time[index])
+
+class LoadData:
+    def __init__(self, type, transport, weight, posture, conditions, frequency, duration, distance, time):
+        self.type = type                # str, "repositioning", "carrying", ...
+        self.transport = transport      # str
+        self.weight = weight            # float64, kg
+        self.posture = posture          # int64, EAWS posture of the load handling
+        self.conditions = conditions    # int64
+        self.frequency = frequency      # int64, #/shift
+        self.duration = duration        # float64, min/shift
+        self.distance = distance        # float64, m/shift
+        self.time = time                # float64, seconds since the start of the recording
+        self.intervals = None           # LoadIntervals of the load events over the posture rows
+        for column in self.columns():
+            column.flags.writeable = False     #shared read-only by the scorers, which select load events with masks instead of removing them
+
+    def columns(self):
+        return [self.type, self.transport, self.weight, self.posture, self.conditions, self.frequency, self.duration, self.distance, self.time]
+
+    def __len__(self):
+        return len(self.time)
+
+    def __getitem__(self, index):
+        #a slice or mask gives a LoadData, an index gives the row as a dict like the old load_data entries
+        if isinstance(index, (slice, np.ndarray)):
+            return LoadData(*[column[index] for column in self.columns()])
+        return {"type": str(self.type[index]), "transport": str(self.transport[index]), "weight": float(self.weight[index]), "posture": int(self.posture[index]),
+                "conditions": int(self.conditions[index]), "frequency": int(self.frequency[index]), "duration": float(self.duration[index]),
+                "distance": float(self.distance[index]), "time": float(self.time[index])}
+
+    def __iter__(self):
+        for row in zip(*[column.tolist() for column in self.columns()]):
+            yield {"type": row[0], "transport": row[1], "weight": row[2], "posture": row[3], "conditions": row[4], "frequency": row[5], "duration": row[6], "distance": row[7], "time": row[8]}
+
+class LoadIntervals:
+    #which load event is active at a given time, for single times or whole timestamp arrays with one searchsorted.
+    #the scores use the load event closest in time, i.e. the first one after the time (the last one after the end of the load events),
+    #the video overlay shows the current load event, i.e. the last one started before the time (the first one before the start)
+    def __init__(self, load_data, posture_data):
+        self.times = load_data.time
+        self.weights = load_data.weight
+        self.posture_loads = self.find_closest_loads(posture_data.timestamp)     # int64, index of the closest load event for each posture row (-1 without load events)
+        if len(self.times):
+            self.heavy_load_postures = self.weights[self.posture_loads] > 3     # bool, posture rows not scored as postures because of a load greater than 3 kg
+        else:
+            self.heavy_load_postures = np.zeros(len(posture_data), dtype=bool)
+        for column in [self.posture_loads, self.heavy_load_postures]:
+            column.flags.writeable = False
+
+    def find_closest_loads(self, times):
+        if not len(self.times):
+            return np.full(len(times), -1, dtype=np.int64)
+        return np.minimum(np.searchsorted(self.times, times, side="right"), len(self.times)-1)
+
+    def find_current_load(self, time):
+        return max(0, int(np.searchsorted(self.times, time, side="left"))-1)
@@ -0,0 +1,76 @@
+import json
+import numpy as np
+
+PYRAMID_MAGIC = b"PLSCORE1"
+PYRAMID_BUCKET_SIZES = [1, 10, 60, 600]     #seconds, from the finest to the coarsest level
+
+class ScorePyramid:
+    #min, max and last value of score channels per time bucket at several resolutions, so a viewer can draw a whole shift
+    #or zoom in on a few seconds without reading every posture sample
+    def __init__(self, channels=None):
+        self.channels = channels    # names of the score channels, read from the file by load
+        self.levels = []            # [bucket size (s), bucket indices (int64), values (float32, buckets x channels x (min, max, last))] from fine to coarse
+
+    def add_level(self, bucket_size, timestamps, values):
+        #timestamps: seconds since the start of the recording (sorted), values: samples x channels
+        values = np.asarray(values, dtype=float).reshape(len(timestamps), len(self.channels))
+        buckets = np.floor(np.asarray(timestamps) / bucket_size).astype(np.int64)
+        if not len(buckets):
+            self.levels.append([bucket_size, buckets, np.zeros((0, len(self.channels), 3), dtype=np.float32)])
+            return
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(buckets)]
+        bucket_values = np.stack([np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts), values[ends-1]], axis=-1)
+        self.levels.append([bucket_size, buckets[starts], bucket_values.astype(np.float32)])
+
+    def save(self, filepath):
+        #magic, header length (uint32) and JSON header with the channels and the byte offset of each level, then the arrays of each level
+        levels = []
+        offset = 0
+        for bucket_size, buckets, values in self.levels:
+            levels.append({"bucket size": bucket_size, "count": len(buckets), "offset": offset})
+            offset += buckets.nbytes + values.nbytes
+        header = json.dumps({"channels": self.channels, "levels": levels}).encode("utf-8")
+        with open(filepath, "wb") as file:
+            file.write(PYRAMID_MAGIC)
+            file.write(np.uint32(len(header)).tobytes())
+            file.write(header)
+            for bucket_size, buckets, values in self.levels:
+                file.write(buckets.astype("<i8").tobytes())
+                file.write(values.astype("<f4").tobytes())
+
+    def load(self, filepath):
+        #the levels are memory-mapped, so only the buckets that are read are loaded from the file
+        with open(filepath, "rb") as file:
+            if file.read(len(PYRAMID_MAGIC)) != PYRAMID_MAGIC:
+                raise ValueError("Not a score pyramid file")
+            header_length = int(np.frombuffer(file.read(4), dtype="<u4")[0])
+            header = json.loads(file.read(header_length).decode("utf-8"))
+        data_offset = len(PYRAMID_MAGIC) + 4 + header_length
+        self.channels = header["channels"]
+        self.levels = []
+        for level in header["levels"]:
+            count = level["count"]
+            offset = data_offset + level["offset"]
+            if count:
+                buckets = np.memmap(filepath, dtype="<i8", mode="r", offset=offset, shape=(count,))
+                values = np.memmap(filepath, dtype="<f4", mode="r", offset=offset + 8*count, shape=(count, len(self.channels), 3))
+            else:
+                buckets = np.zeros(0, dtype=np.int64)
+                values = np.zeros((0, len(self.channels), 3), dtype=np.float32)
+            self.levels.append([level["bucket size"], buckets, values])
+        return self
+
+    def find_level(self, start, end, max_buckets=2000):
+        #finest level with at most max_buckets buckets between start and end (seconds), or the coarsest level
+        for level in range(len(self.levels)):
+            if (end - start) / self.levels[level][0] <= max_buckets:
+                return level
+        return len(self.levels) - 1
+
+    def get_range(self, level, start, end):
+        #start times (s) and values (buckets x channels x (min, max, last)) of the buckets of the level between start and end
+        bucket_size, buckets, values = self.levels[level]
+        first = np.searchsorted(buckets, np.floor(start / bucket_size), side="left")
+        last = np.searchsorted(buckets, np.floor(end / bucket_size), side="right")
+        return buckets[first:last] * bucket_size, np.asarray(values[first:last])
@@ -0,0 +1,103 @@
+from eaws_score import EAWSScore
+from KIM_score import KIMScore
+
+class ScoreTimeline:
+    def __init__(self, operator, task, posture_data, load_data, extra_loads):
+        self.operator = operator
+        self.task = task
+        self.posture_data = posture_data
+        self.load_data = load_data
+        self.extra_loads = extra_loads
+
+        # Computed on first use and then shared by the score files, the video overlay and the score of the whole recording
+        self.eaws_timeline = None
+        self.kim_timeline = None
+        self.eaws = None
+        self.kim = None
+        self.overlay_scores = None
+        self.partial_scores = None
+
+    def get_eaws_timeline(self):
+        #(whole body extra score, posture score, loads score, EAWS score) for each posture index
+        if self.eaws_timeline is None:
+            eaws = EAWSScore(self.operator, self.task, self.posture_data, self.load_data)
+            eaws.calculate_whole_body_extra_points(self.extra_loads)
+            self.eaws_timeline = eaws.calculate_eaws_timeline()
+        return self.eaws_timeline
+
+    def get_kim_timeline(self):
+        #[MHO, ABP, BM, BF, LHC, PP] scores ([time rating, score]) for each posture index
+        if self.kim_timeline is None:
+            kim = KIMScore(self.operator, self.task, self.posture_data, self.load_data)
+            self.kim_timeline = kim.calculate_KIM_timeline()
+        return self.kim_timeline
+
+    def get_partial_scores(self):
+        #EAWS and KIM partial aggregates of the recording, see calculate_partial_scores
+        if self.partial_scores is None:
+            self.partial_scores = self.calculate_partial_scores()
+        return self.partial_scores
+
+    def calculate_partial_scores(self):
+        # Accumulate the EAWS posture times and the KIM ABP and additional durations in a single pass over the posture episodes,
+        # with the postures aligned to the load events once for both methods
+        eaws = EAWSScore(self.operator, self.task, self.posture_data, self.load_data)
+        kim = KIMScore(self.operator, self.task, self.posture_data, self.load_data)
+
+        episodes = eaws.get_posture_episodes()
+        heavy_loads = eaws.get_load_intervals().heavy_load_postures[episodes.start].tolist()
+        posture_groups = self.posture_data.lookup("EAWS posture groups", eaws.find_posture_groups)
+        ABP_categories = self.posture_data.lookup("KIM ABP categories", kim.find_ABP_posture_categories)
+        additional_flags = self.posture_data.lookup("KIM additional flags", kim.find_additional_flags)
+
+        accumulated_times = [{}, {}, {}, {}]        #prefixes, FRX groups, TRX groups and LBX groups
+        ABP_durations = [[0]*6, [0]*6, [0]*6]       #postures A, B and C, the last duration is for twisting/bending
+        twisting_durations = [0, 0, 0]
+        additional_durations = [0]*4
+        for code, time, heavy_load in zip(episodes.code.tolist(), episodes.time.tolist(), heavy_loads):
+            kim.accumulate_additional_flags(additional_durations, additional_flags[code], time)
+            if heavy_load:      #postures are not scored for loads greater than 3 kg (use handled loads instead)
+                continue
+            eaws.accumulate_posture_groups(accumulated_times, posture_groups[code], time)
+            for posture_group in range(3):
+                category, twisting = ABP_categories[code][posture_group]
+                if category is not None:
+                    ABP_durations[posture_group][category] += time
+                if twisting:
+                    twisting_durations[posture_group] += time
+
+        #calculate_ABP keeps adding to the twisting/bending duration in each of its three passes
+        for posture_group in range(3):
+            ABP_durations[posture_group][-1] = sum(twisting_durations[:posture_group+1])
+
+        return eaws.calculate_partial_score(accumulated_times), kim.calculate_partial_score(ABP_durations, additional_durations)
+
+    def get_eaws(self):
+        #EAWS scorer after scoring the whole recording
+        if self.eaws is None:
+            eaws = EAWSScore(self.operator, self.task, self.posture_data, self.load_data)
+            eaws.calculate_whole_body_extra_points(self.extra_loads)
+            eaws.calculate_merged_score(self.get_partial_scores()[0])
+            self.eaws = eaws
+        return self.eaws
+
+    def get_eaws_partial_score(self):
+        #posture and load aggregates of the recording, for scoring it again with other extra points
+        return self.get_partial_scores()[0]
+
+    def get_kim(self):
+        #KIM scorer after scoring the whole recording
+        if self.kim is None:
+            kim = KIMScore(self.operator, self.task, self.posture_data, self.load_data)
+            kim.calculate_merged_score(self.get_partial_scores()[1])
+            self.kim = kim
+        return self.kim
+
+    def get_overlay_scores(self):
+        #(whole body extra score, posture score, loads score, EAWS score, KIM score) for each posture index
+        if self.overlay_scores is None:
+            self.overlay_scores = {}
+            for index, (eaws_scores, KIM_scores) in enumerate(zip(self.get_eaws_timeline(), self.get_kim_timeline())):
+                KIM_score = sum([KIM_scores[i][0]*KIM_scores[i][1] for i in range(len(KIM_scores))])
+                self.overlay_scores[index] = tuple(eaws_scores) + (KIM_score,)
+        return self.overlay_scores
@@ -0,0 +1,54 @@
+import numpy as np
+
+from physical_load import PhysicalLoad
+from participant import Operator
+from task import Task
+from score_pyramid import ScorePyramid, PYRAMID_BUCKET_SIZES
+
+HEADER = """Name: sess1_JohnD
+Type: {type}
+Channels: 1
+SRate: 60Hz
+Start time: 2024-01-01 10:00:00.000
+End time: 2024-01-01 10:00:30.000
+
+"""
+
+def write_recording(directory):
+    postures = ["St_U_FR0_TR0_LB0", "St_BF_FR2_TR0_LB1", "St_BS_FR2_TR1_LB0", "Cr_U_FR0_TR0_LB0"]
+    with open(directory / "sess1_JohnD - AutoDePos.csv", "w") as file:
+        file.write(HEADER.format(type="AutoDePos"))
+        file.write("Time[HH:mm:ss.fff],Pose\n")
+        for i in range(60):
+            file.write(f"10:00:{i//2:02d}.{500*(i % 2):03d},{postures[i//7 % len(postures)]}\n")
+        file.write("\n")
+    with open(directory / "sess1_JohnD - AutoDeLoad.csv", "w") as file:
+        file.write(HEADER.format(type="AutoDeLoad"))
+        file.write("type,transport,weight (kg),posture,conditions,frequency (#/shift),duration (min/shift),distance (m/shift),time (HH:mm:ss.fff)\n")
+        file.write("holding,None,12.0,8,0,0,0,0,10:00:02.000000\n")
+        file.write("carrying,None,8.0,4,0,0,0,5,10:00:12.000000\n")
+        file.write("repositioning,None,4.0,4,0,3,0,0,10:00:21.000000\n")
+
+def test_score_pyramid_round_trip(tmp_path, monkeypatch):
+    write_recording(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    physical_load = PhysicalLoad("EAWS", "sess1_JohnD - AutoDePos.csv", "sess1_JohnD - AutoDeLoad.csv", Operator("John Doe", "M", 185, 65), Task("Palletizing of weights"))
+    physical_load.save_score_pyramid_to_file()
+
+    score_pyramid = ScorePyramid().load("sess1_JohnD_scores.pyr")
+    assert score_pyramid.channels == ["EAWS score", "whole body extra score", "posture score", "loads score", "KIM score"]
+    assert [level[0] for level in score_pyramid.levels] == PYRAMID_BUCKET_SIZES
+
+    #the finest level has the scores of each second, the last value of a bucket is the score of its last posture
+    overlay_scores = physical_load.get_score_timeline().get_overlay_scores()
+    timestamps = physical_load.posture_data.timestamp
+    start_times, values = score_pyramid.get_range(0, 0, 30)
+    assert start_times.tolist() == list(range(30))
+    for start_time, bucket_values in zip(start_times.tolist(), values):
+        rows = np.flatnonzero(np.floor(timestamps) == start_time)
+        eaws_scores = [overlay_scores[row][3] for row in rows]
+        assert bucket_values[0].tolist() == np.float32([min(eaws_scores), max(eaws_scores), eaws_scores[-1]]).tolist()
+
+    #the coarsest level covers the whole recording in one bucket
+    start_times, values = score_pyramid.get_range(score_pyramid.find_level(0, 30, max_buckets=1), 0, 30)
+    assert start_times.tolist() == [0]
@@ -0,0 +1,41 @@
+import cv2
+import numpy as np
+from collections import OrderedDict
+
+class TextOverlay:
+    def __init__(self, font_face=cv2.FONT_HERSHEY_SIMPLEX, font_scale=0.7, font_thickness=1, text_color=(255, 255, 255), text_bg_color=(0, 0, 0), max_sprites=256):
+        self.font_face = font_face
+        self.font_scale = font_scale
+        self.font_thickness = font_thickness
+        self.text_color = text_color            # BGR
+        self.text_bg_color = text_bg_color      # BGR
+        self.max_sprites = max_sprites          # texts that change every frame (e.g. timestamps) would otherwise fill up the cache
+        self.sprites = OrderedDict()            # text -> [sprite, baseline position in sprite]
+
+    def get_sprite(self, text):
+        #rasterise the text on its background only the first time it is shown
+        if text in self.sprites:
+            self.sprites.move_to_end(text)
+            return self.sprites[text]
+
+        (text_width, text_height), baseline = cv2.getTextSize(text, self.font_face, self.font_scale, self.font_thickness)
+        sprite = np.empty((text_height + baseline + 1, text_width + 1, 3), np.uint8)
+        sprite[:] = self.text_bg_color
+        cv2.putText(sprite, text, (0, text_height), self.font_face, self.font_scale, self.text_color, self.font_thickness, cv2.LINE_AA)
+
+        self.sprites[text] = [sprite, text_height]
+        if len(self.sprites) > self.max_sprites:
+            self.sprites.popitem(last=False)
+        return self.sprites[text]
+
+    def draw(self, frame, lines):
+        #copy the sprite of each (text, (x, y)) line into the frame, with (x, y) the start of the text baseline
+        for text, (x, y) in lines:
+            sprite, text_height = self.get_sprite(text)
+            top = y - text_height
+            bottom = min(top + sprite.shape[0], frame.shape[0])
+            right = min(x + sprite.shape[1], frame.shape[1])
+            if top < 0 or bottom <= top or right <= x:
+                continue
+            frame[top:bottom, x:right] = sprite[:bottom-top, :right-x]
+        return frame